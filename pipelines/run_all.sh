@@ -0,0 +1,12 @@
+#!/usr/bin/env bash
+# Run the full pipeline (raw -> staging -> features -> datasets -> model -> predictions).
+# Stages whose inputs, code and parameters are unchanged are skipped.
+#
+#   pipelines/run_all.sh                 # bring everything up to date
+#   pipelines/run_all.sh train --force   # re-run one stage (and nothing upstream that is fresh)
+#   pipelines/run_all.sh --dry-run
+set -euo pipefail
+
+SRC_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../src" && pwd)"
+cd "${SRC_DIR}"
+PYTHONPATH="${SRC_DIR}" exec "${PYTHON:-python}" -m pipelines.dag "$@"
@@ -0,0 +1,54 @@
+# coding: utf-8
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import load
+from loguru import logger
+
+from models.compiled_scorer import MODEL_FILE, compile_pipeline, predict_proba
+from models.predict_baseline import INFERENCE_FILE
+
+
+def make_frame(n_rows: int) -> pd.DataFrame:
+    """
+    Tile the inference set up to `n_rows` rows.
+    """
+
+    base = pd.read_parquet(INFERENCE_FILE)
+    reps = -(-n_rows // len(base))
+    return pd.concat([base] * reps, ignore_index=True).iloc[:n_rows]
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="sklearn predict_proba vs compiled scorer.")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args(argv)
+
+    bundle = load(MODEL_FILE)
+    compiled = compile_pipeline(bundle)
+    df = make_frame(args.rows)
+    logger.info(f"benchmark frame: {df.shape}")
+
+    expected, t_sklearn = _timed(lambda x: bundle["model"].predict_proba(x)[:, 1], df)
+    got, t_compiled = _timed(predict_proba, compiled, df)
+    diff = float(np.max(np.abs(expected - got)))
+    if diff > 1e-9:
+        raise ValueError(f"parity FAILED: max |diff|={diff:.3e}")
+    logger.info(f"parity OK: max |diff|={diff:.1e}")
+
+    rows = args.rows
+    logger.info(f"sklearn : {t_sklearn:.2f}s ({rows / t_sklearn:,.0f} rows/sec)")
+    logger.info(f"compiled: {t_compiled:.2f}s ({rows / t_compiled:,.0f} rows/sec)")
+    logger.info(f"speedup: {t_sklearn / t_compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# coding: utf-8
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from ingestion.load_raw import RAW_FILE
+from models.predict_baseline import load_scorer
+from serving.service import MAX_BATCH, MAX_WAIT_MS, make_server, score_records
+
+
+def load_records() -> list[dict]:
+    """
+    Raw CRM-style records (raw extract field names, string values).
+    """
+
+    raw = pd.read_csv(RAW_FILE, dtype=str, keep_default_na=False)
+    return raw.to_dict("records")
+
+
+def check_bad_numeric(records: list[dict]) -> None:
+    """
+    A field that fails typed conversion must take the diagnostic fallback
+    (NaN + warning, as in batch ingestion), not fail the request: the
+    record scores like one with the field left blank.
+    """
+
+    scorer = load_scorer()
+    bad = score_records([{**records[0], "TotalCharges": "abc"}], scorer)
+    blank = score_records([{**records[0], "TotalCharges": " "}], scorer)
+    if not np.isfinite(bad["p_churn"]).all():
+        raise ValueError("Record with a non-numeric TotalCharges did not score")
+    np.testing.assert_allclose(bad["p_churn"].to_numpy(), blank["p_churn"].to_numpy())
+    logger.info("fallback OK: non-numeric TotalCharges scores as NaN")
+
+
+def _client(host: str, port: int, records: list[dict], n_requests: int, seed: int, latencies: list) -> None:
+    rng = np.random.default_rng(seed)
+    conn = http.client.HTTPConnection(host, port)
+    headers = {"Content-Type": "application/json"}
+    try:
+        for i in rng.integers(0, len(records), size=n_requests):
+            start = time.perf_counter()
+            conn.request("POST", "/score", body=json.dumps(records[i]), headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+            if resp.status != 200:
+                raise ValueError(f"HTTP {resp.status}: {body[:200]!r}")
+            latencies.append(time.perf_counter() - start)
+    finally:
+        conn.close()
+
+
+def _get_json(host: str, port: int, path: str) -> dict:
+    conn = http.client.HTTPConnection(host, port)
+    try:
+        conn.request("GET", path)
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Load generator for the online scoring service.")
+    parser.add_argument("--url", default=None, help="running service, e.g. http://127.0.0.1:8080 "
+                                                    "(default: start one in-process on a free port)")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent clients, one request in flight each")
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url is None:
+        server = make_server("127.0.0.1", 0, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = "127.0.0.1", server.server_port
+    else:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port
+
+    records = load_records()
+    check_bad_numeric(records)
+    latencies = []
+    clients = [
+        threading.Thread(target=_client, args=(host, port, records, args.requests, seed, latencies))
+        for seed in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for t in clients:
+        t.start()
+    for t in clients:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    lat = np.array(latencies) * 1e3
+    n = len(lat)
+    if n != args.clients * args.requests:
+        raise ValueError(f"{args.clients * args.requests - n} request(s) failed")
+    logger.info(f"clients={args.clients} requests={n} in {elapsed:.2f}s ({n / elapsed:,.0f} req/sec)")
+    logger.info(f"client latency ms: p50={np.percentile(lat, 50):.2f} p99={np.percentile(lat, 99):.2f}")
+    logger.info(f"server metrics: {_get_json(host, port, '/metrics')}")
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+        server.batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# coding: utf-8
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from loguru import logger
+
+from constants import PROJECT_ROOT
+
+SRC_DIR = PROJECT_ROOT / "src"
+
+# Import the scoring entry point and load the scorer, then report whether
+# sklearn ended up imported.
+_LOAD_SNIPPET = """
+import sys
+from models.predict_baseline import load_scorer
+load_scorer({engine!r})
+print("sklearn" in sys.modules)
+"""
+
+
+def _cold_start(args: list[str]) -> tuple[float, str]:
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, *args], cwd=SRC_DIR, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise ValueError(f"{args} failed:\n{proc.stderr[-2000:]}")
+    return elapsed, proc.stdout.strip()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Cold-start time of the scoring entry points.")
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    cases = {
+        f"load {engine}": ["-c", _LOAD_SNIPPET.format(engine=engine)]
+        for engine in ("sklearn", "compiled")
+    }
+    cases.update({
+        f"predict_baseline {engine}": ["-m", "models.predict_baseline", "--engine", engine]
+        for engine in ("sklearn", "compiled")
+    })
+    cases["interpreter only"] = ["-c", "pass"]
+
+    results = {}
+    for name, case_args in cases.items():
+        _cold_start(case_args)  # warm the OS file cache, not the interpreter
+        runs = [_cold_start(case_args) for _ in range(args.runs)]
+        results[name] = statistics.median(t for t, _ in runs)
+        sklearn = runs[-1][1] if name.startswith("load") else "-"
+        logger.info(f"{name:<28} median={results[name] * 1e3:8.1f} ms  sklearn imported={sklearn}")
+
+    for step in ("load", "predict_baseline"):
+        speedup = results[f"{step} sklearn"] / results[f"{step} compiled"]
+        logger.info(f"{step}: compiled artifact starts {speedup:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
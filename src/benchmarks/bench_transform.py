@@ -0,0 +1,109 @@
+# coding: utf-8
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+from loguru import logger
+
+from staging.transform import IN_FILE, dictionary_encoded_frame, fused_transform, legacy_transform, read_dictionary_encoded
+
+
+def _as_strings(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Decode categorical columns, to compare against the legacy string output.
+    """
+
+    return df.astype({c: "string" for c in df.select_dtypes(include=["category"]).columns})
+
+
+def make_frame(n_rows: int) -> pd.DataFrame:
+    """
+    Tile the staging table up to `n_rows` rows, with plain `string` columns
+    as the legacy transform expects.
+    """
+
+    base = _as_strings(pd.read_parquet(IN_FILE))
+    reps = -(-n_rows // len(base))
+    return pd.concat([base] * reps, ignore_index=True).iloc[:n_rows]
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+def _legacy_stage(path: Path) -> pd.DataFrame:
+    return legacy_transform(pd.read_parquet(path))
+
+
+def _fused_stage(path: Path) -> pd.DataFrame:
+    return fused_transform(read_dictionary_encoded(path))
+
+
+def check_edge_cases(df: pd.DataFrame) -> None:
+    """
+    Parity on frames the benchmark data does not cover: an all-null string
+    column (object dtype, and dictionary-encoded from arrow) and no rows.
+    """
+
+    all_null = df.head(1_000).astype(object)
+    all_null["partner"] = None
+    pd.testing.assert_frame_equal(_as_strings(fused_transform(all_null.copy())), legacy_transform(all_null.copy()))
+
+    table = pa.Table.from_pandas(all_null, preserve_index=False)
+    pd.testing.assert_frame_equal(
+        _as_strings(fused_transform(dictionary_encoded_frame(table))),
+        _as_strings(legacy_transform(table.to_pandas())),
+    )
+
+    empty = df.iloc[:0]
+    pd.testing.assert_frame_equal(_as_strings(fused_transform(empty.copy())), legacy_transform(empty.copy()))
+    logger.info("parity OK (all-null column, empty frame)")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Legacy vs fused staging transform.")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--skip-parity", action="store_true")
+    args = parser.parse_args(argv)
+
+    df = make_frame(args.rows)
+    logger.info(f"benchmark frame: {df.shape}")
+
+    if not args.skip_parity:
+        check_edge_cases(df)
+
+    # 1) Transform only, both on plain `string` columns
+    fused, t_fused = _timed(fused_transform, df.copy())
+    legacy, t_legacy = _timed(legacy_transform, df.copy())
+    if not args.skip_parity:
+        pd.testing.assert_frame_equal(_as_strings(fused), legacy)
+        logger.info("parity OK (transform only)")
+    del fused, legacy
+
+    # 2) Stage as run by `main`: parquet read + transform
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "staging.parquet"
+        df.to_parquet(path, index=False)
+        del df
+        fused, t_fused_stage = _timed(_fused_stage, path)
+        legacy, t_legacy_stage = _timed(_legacy_stage, path)
+    if not args.skip_parity:
+        pd.testing.assert_frame_equal(_as_strings(fused), _as_strings(legacy))
+        logger.info("parity OK (read + transform)")
+
+    rows = args.rows
+    logger.info(f"transform only  legacy: {t_legacy:.2f}s ({rows / t_legacy:,.0f} rows/sec)")
+    logger.info(f"transform only  fused : {t_fused:.2f}s ({rows / t_fused:,.0f} rows/sec)")
+    logger.info(f"transform only  speedup: {t_legacy / t_fused:.1f}x")
+    logger.info(f"read + transform legacy: {t_legacy_stage:.2f}s ({rows / t_legacy_stage:,.0f} rows/sec)")
+    logger.info(f"read + transform fused : {t_fused_stage:.2f}s ({rows / t_fused_stage:,.0f} rows/sec)")
+    logger.info(f"read + transform speedup: {t_legacy_stage / t_fused_stage:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,20 @@
 # coding: utf-8
+import argparse
+import math
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from loguru import logger
 
 from constants import DATA
-from datasets.splits import stratified_split
+from datasets.splits import hash_split, stratified_split, validation_mask
+from validation.streaming import hash_ids, iter_pieces, read_piece
 
 FEATURE_FILE = DATA / "features" / "telco_customer_features.parquet"
 CLEAN_FILE = DATA / "staging" / "telco_customers_clean.parquet"
@@ -11,6 +22,15 @@ TRAIN_FILE = DATA / "datasets" / "train.parquet"
 VALIDATION_FILE = DATA / "datasets" / "validation.parquet"
 INFERENCE_FILE = DATA / "datasets" / "inference.parquet"
 
+SPLITS = ("stratified", "hash")
+
+ID_COL = "customer_id"
+TARGET_COL = "churn"
+
+# Target on-disk size of one join partition; peak memory is about one
+# feature partition plus its labels.
+PARTITION_BYTES = 256 << 20
+
 
 def _log_class_balance(df: pd.DataFrame, name: str) -> None:
     """
@@ -21,9 +41,22 @@ def _log_class_balance(df: pd.DataFrame, name: str) -> None:
     logger.info(f"[{name}] rows={n}, churn_rate={churn_rate:.4f}")
 
 
-def main():
-    feature_df = pd.read_parquet(FEATURE_FILE)
-    clean_df = pd.read_parquet(CLEAN_FILE)
+def build_datasets(
+        feature_df: pd.DataFrame,
+        clean_df: pd.DataFrame,
+        split: str = "stratified",
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Join labels to features and split into train / validation / inference.
+
+    :param feature_df: feature table
+    :param clean_df: clean staging frame (needs customer_id, churn)
+    :param split: "stratified" (random, sklearn) or "hash" (stable per customer_id)
+    :return: train_df, validation_df, inference_df
+    """
+
+    if split not in SPLITS:
+        raise ValueError(f"Unknown split `{split}`, expected one of {SPLITS}")
 
     # Build labels (target)
     label_df = clean_df[["customer_id", "churn"]].copy()
@@ -40,8 +73,11 @@ def main():
             f"Check customer_id consistency between features and staging."
         )
 
-    # Train/Validation split (stratified)
-    train_df, validation_df = stratified_split(feature_label_df, target="churn", test_size=0.2, random_state=42)
+    # Train/Validation split
+    if split == "hash":
+        train_df, validation_df = hash_split(feature_label_df, target="churn", test_size=0.2)
+    else:
+        train_df, validation_df = stratified_split(feature_label_df, target="churn", test_size=0.2, random_state=42)
 
     # --- Log class balance ---
     _log_class_balance(train_df, "train")
@@ -49,6 +85,170 @@ def main():
 
     # Inference dataset: features only (no churn)
     inference_df = feature_df.copy()
+    return train_df, validation_df, inference_df
+
+
+def _dataset_bytes(path) -> int:
+    return sum(Path(f).stat().st_size for f in pq.ParquetDataset(path).files)
+
+
+class _Sink:
+    """
+    Lazily opened parquet writers, one per output file.
+    """
+
+    def __init__(self):
+        self.writers = {}
+
+    def append(self, out, df: pd.DataFrame) -> None:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if out not in self.writers:
+            self.writers[out] = pq.ParquetWriter(out, table.schema)
+        if table.num_rows:
+            self.writers[out].write_table(table)
+
+    def close(self) -> None:
+        for writer in self.writers.values():
+            writer.close()
+
+
+def _partition(path, columns, n_partitions: int, out_dir: Path, tag: str) -> list[Path | None]:
+    """
+    Stream a parquet file by row group and scatter its rows into
+    `n_partitions` spill files by a hash of customer_id.
+    """
+
+    files = [out_dir / f"{tag}-{p:05d}.parquet" for p in range(n_partitions)]
+    sink = _Sink()
+    try:
+        for piece in iter_pieces(path):
+            df = read_piece(piece, columns=columns)
+            part = hash_ids(df[ID_COL].astype("string")) % n_partitions
+            for p in np.unique(part):
+                sink.append(files[p], df[part == p])
+    finally:
+        sink.close()
+    return [f if f.exists() else None for f in files]
+
+
+def link_inference(feature_file, inference_file) -> None:
+    """
+    The inference set is the feature table itself: publish it as a relative
+    symlink (zero copy), falling back to a file copy where symlinks are
+    unavailable.
+    """
+
+    inference_file = Path(inference_file)
+    inference_file.unlink(missing_ok=True)
+    try:
+        inference_file.symlink_to(os.path.relpath(feature_file, inference_file.parent))
+    except OSError:
+        if Path(feature_file).is_dir():
+            shutil.copytree(feature_file, inference_file)
+        else:
+            shutil.copyfile(feature_file, inference_file)
+
+
+def build_datasets_streaming(
+        feature_file=FEATURE_FILE,
+        clean_file=CLEAN_FILE,
+        train_file=TRAIN_FILE,
+        validation_file=VALIDATION_FILE,
+        inference_file=INFERENCE_FILE,
+        test_size: float = 0.2,
+        n_partitions: int | None = None,
+) -> pd.DataFrame:
+    """
+    Partition-wise hash join of features and labels, writing train,
+    validation and inference in one pass with bounded memory.
+
+    Both inputs are scattered by a hash of customer_id into `n_partitions`
+    spill files (skipped when one partition suffices); each partition pair is
+    then joined and split with the stable hash split, and appended to the
+    train / validation files. Inference is a link to the feature file.
+
+    :param feature_file: feature parquet
+    :param clean_file: clean staging parquet (customer_id, churn are read)
+    :param train_file: train parquet to write
+    :param validation_file: validation parquet to write
+    :param inference_file: inference parquet to publish
+    :param test_size: validation share
+    :param n_partitions: join partitions, default from the feature file size
+    :return: per-class row counts (index: churn, columns: train / validation)
+    """
+
+    if n_partitions is None:
+        n_partitions = max(1, math.ceil(_dataset_bytes(feature_file) / PARTITION_BYTES))
+    label_cols = [ID_COL, TARGET_COL]
+
+    sink = _Sink()
+    counts = pd.DataFrame(0, index=pd.Index([0, 1], name=TARGET_COL), columns=["train", "validation"])
+    n_features = n_joined = 0
+    with tempfile.TemporaryDirectory(dir=Path(train_file).parent) as tmp:
+        if n_partitions == 1:
+            pairs = [(feature_file, clean_file)]
+        else:
+            tmp = Path(tmp)
+            pairs = zip(
+                _partition(feature_file, None, n_partitions, tmp, "features"),
+                _partition(clean_file, label_cols, n_partitions, tmp, "labels"),
+            )
+        logger.info(f"feature-label join over {n_partitions} partition(s)")
+
+        try:
+            for feature_part, label_part in pairs:
+                if feature_part is None:
+                    continue
+                feature_df = pd.read_parquet(feature_part)
+                label_df = (
+                    pd.read_parquet(label_part, columns=label_cols) if label_part is not None
+                    else pd.DataFrame({ID_COL: pd.Series(dtype="string"), TARGET_COL: pd.Series(dtype="int8")})
+                )
+                label_df[TARGET_COL] = label_df[TARGET_COL].astype("int8")
+                joined = feature_df.merge(label_df, on=ID_COL, how="inner", validate="one_to_one")
+                n_features += len(feature_df)
+                n_joined += len(joined)
+
+                is_val = validation_mask(joined[ID_COL], test_size)
+                sink.append(train_file, joined[~is_val])
+                sink.append(validation_file, joined[is_val])
+                counts["train"] = counts["train"].add(joined.loc[~is_val, TARGET_COL].value_counts(), fill_value=0)
+                counts["validation"] = counts["validation"].add(joined.loc[is_val, TARGET_COL].value_counts(),
+                                                                fill_value=0)
+        finally:
+            sink.close()
+
+    # --- Sanity check: join should not drop rows ---
+    if n_joined != n_features:
+        raise ValueError(
+            f"Feature–label join dropped {n_features - n_joined} rows. "
+            f"Check customer_id consistency between features and staging."
+        )
+
+    link_inference(feature_file, inference_file)
+
+    counts = counts.astype("int64")
+    for name in counts.columns:
+        n = counts[name].sum()
+        logger.info(f"[{name}] rows={n}, churn_rate={counts.loc[1, name] / max(n, 1):.4f}")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Phase 4 train / validation / inference datasets.")
+    parser.add_argument("--split", choices=SPLITS, default="stratified",
+                        help="hash: stable per-customer assignment across runs, built with the "
+                             "partition-wise streaming join (bounded memory)")
+    args = parser.parse_args(argv)
+
+    if args.split == "hash":
+        build_datasets_streaming()
+        return
+
+    feature_df = pd.read_parquet(FEATURE_FILE)
+    clean_df = pd.read_parquet(CLEAN_FILE, columns=["customer_id", "churn"])
+
+    train_df, validation_df, inference_df = build_datasets(feature_df, clean_df, split=args.split)
 
     train_df.to_parquet(TRAIN_FILE, index=False)
     validation_df.to_parquet(VALIDATION_FILE, index=False)
@@ -1,9 +1,15 @@
 # coding: utf-8
+import argparse
+
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from loguru import logger
 
 from constants import DATA
+from validation.engine import raise_on_violations
+from validation.streaming import hash_ids, iter_pieces, read_piece, validate_parquet
 
 TRAIN_FILE = DATA / "datasets" / "train.parquet"
 VALIDATION_FILE = DATA / "datasets" / "validation.parquet"
@@ -13,64 +19,98 @@ TARGET_COL = "churn"
 ID_COL = "customer_id"
 
 
-def _require_columns(df: pd.DataFrame, cols: list[str], name: str) -> None:
-    missing = [c for c in cols if c not in df.columns]
+def _schema(path) -> pa.Schema:
+    return pq.ParquetDataset(path).schema
+
+
+def _require_columns(schema: pa.Schema, cols: list[str], name: str) -> None:
+    missing = [c for c in cols if c not in schema.names]
     if missing:
         raise ValueError(f"[{name}] Missing required columns: {missing}")
 
 
-def _log_basic_stats(df: pd.DataFrame, name: str, has_target: bool) -> None:
-    n = len(df)
-    logger.info(f"[{name}] rows={n}")
-
-    if df[ID_COL].duplicated().any():
-        raise ValueError(f"[{name}] Duplicate {ID_COL} found")
+def _numeric_columns(schema: pa.Schema) -> list[str]:
+    # Only check numeric columns
+    return [f.name for f in schema if pa.types.is_integer(f.type) or pa.types.is_floating(f.type)]
 
-    if df[ID_COL].isna().any():
-        raise ValueError(f"[{name}] {ID_COL} contains NULLs")
 
+def _dataset_rules(schema: pa.Schema, has_target: bool) -> list[dict]:
+    rules = [
+        {"name": f"{ID_COL}_not_null", "kind": "not_null", "column": ID_COL},
+        {"name": f"{ID_COL}_unique", "kind": "unique", "column": ID_COL},
+    ]
     if has_target:
-        if df[TARGET_COL].isna().any():
-            raise ValueError(f"[{name}] {TARGET_COL} contains NULLs")
+        rules.append({"name": f"{TARGET_COL}_not_null", "kind": "not_null", "column": TARGET_COL})
+        # churn domain check
+        rules.append({"name": f"{TARGET_COL}_domain", "kind": "domain", "column": TARGET_COL, "values": [0, 1]})
+    # Numeric inf/NaN checks (very common failure: avg_monthly_charges)
+    rules.extend(
+        {"name": f"{c}_finite", "kind": "finite", "column": c}
+        for c in _numeric_columns(schema) if c != TARGET_COL
+    )
+    return rules
+
+
+def _log_basic_stats(path, name: str, has_target: bool) -> None:
+    n = sum(pq.ParquetFile(f).metadata.num_rows for f in pq.ParquetDataset(path).files)
+    logger.info(f"[{name}] rows={n}")
 
-        churn_rate = float(df[TARGET_COL].mean())
+    if has_target:
+        positives = sum(
+            int(read_piece(piece, columns=[TARGET_COL])[TARGET_COL].sum()) for piece in iter_pieces(path)
+        )
+        churn_rate = positives / max(n, 1)
         logger.info(f"[{name}] churn_rate={churn_rate:.4f}")
 
 
-def _check_no_inf_nan_numeric(df: pd.DataFrame, name: str) -> None:
-    # Only check numeric columns
-    num_cols = df.select_dtypes(include=["number"]).columns.tolist()
-    if not num_cols:
+def _id_hashes(path) -> np.ndarray:
+    return np.concatenate([hash_ids(read_piece(p, columns=[ID_COL])[ID_COL]) for p in iter_pieces(path)])
+
+
+def _check_no_overlap(left, right) -> None:
+    """
+    No customer_id in both files. Compares 64-bit hashes first and confirms
+    the (rare) candidates against the real ids.
+    """
+
+    candidates = np.intersect1d(_id_hashes(left), _id_hashes(right))
+    if not len(candidates):
         return
 
-    arr = df[num_cols].to_numpy()
-    if not np.isfinite(arr).all():
-        # Find first few problematic cells for debugging
-        bad_mask = ~np.isfinite(arr)
-        bad_locs = np.argwhere(bad_mask)
-        sample = bad_locs[:10]
-        details = []
-        for r, c in sample:
-            details.append((df.index[r], num_cols[c], df.iloc[r][num_cols[c]]))
-        raise ValueError(f"[{name}] Numeric columns contain inf/NaN. Sample: {details}")
+    def ids_for(path) -> set:
+        out = set()
+        for piece in iter_pieces(path):
+            ids = read_piece(piece, columns=[ID_COL])[ID_COL]
+            out.update(ids[np.isin(hash_ids(ids), candidates)].tolist())
+        return out
 
+    overlap = ids_for(left) & ids_for(right)
+    if overlap:
+        # Print a small sample for debugging
+        sample = sorted(overlap)[:10]
+        raise ValueError(f"Train/Validation overlap detected in {ID_COL}. Sample: {sample}")
 
-def main() -> None:
-    train_df = pd.read_parquet(TRAIN_FILE)
-    val_df = pd.read_parquet(VALIDATION_FILE)
-    inf_df = pd.read_parquet(INFERENCE_FILE)
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Phase 4 dataset checks.")
+    parser.add_argument("--fail-fast", action="store_true", help="stop at the first violated rule")
+    args = parser.parse_args(argv)
+
+    train_schema = _schema(TRAIN_FILE)
+    val_schema = _schema(VALIDATION_FILE)
+    inf_schema = _schema(INFERENCE_FILE)
 
     # --- Target presence rules ---
-    _require_columns(train_df, [ID_COL, TARGET_COL], "train")
-    _require_columns(val_df, [ID_COL, TARGET_COL], "validation")
-    _require_columns(inf_df, [ID_COL], "inference")
+    _require_columns(train_schema, [ID_COL, TARGET_COL], "train")
+    _require_columns(val_schema, [ID_COL, TARGET_COL], "validation")
+    _require_columns(inf_schema, [ID_COL], "inference")
 
-    if TARGET_COL in inf_df.columns:
+    if TARGET_COL in inf_schema.names:
         raise ValueError("[inference] Target column churn must NOT exist in inference dataset")
 
     # --- Feature columns must match between train and validation (excluding target) ---
-    train_feat_cols = [c for c in train_df.columns if c != TARGET_COL]
-    val_feat_cols = [c for c in val_df.columns if c != TARGET_COL]
+    train_feat_cols = [c for c in train_schema.names if c != TARGET_COL]
+    val_feat_cols = [c for c in val_schema.names if c != TARGET_COL]
 
     if set(train_feat_cols) != set(val_feat_cols):
         only_in_train = sorted(set(train_feat_cols) - set(val_feat_cols))
@@ -82,28 +122,22 @@ def main() -> None:
         )
 
     # --- No overlap of customer_id between train and validation ---
-    overlap = set(train_df[ID_COL]) & set(val_df[ID_COL])
-    if overlap:
-        # Print a small sample for debugging
-        sample = list(overlap)[:10]
-        raise ValueError(f"Train/Validation overlap detected in {ID_COL}. Sample: {sample}")
-
-    # --- Basic stats & sanity ---
-    _log_basic_stats(train_df, "train", has_target=True)
-    _log_basic_stats(val_df, "validation", has_target=True)
-    _log_basic_stats(inf_df, "inference", has_target=False)
-
-    # --- Numeric inf/NaN checks (very common failure: avg_monthly_charges) ---
-    _check_no_inf_nan_numeric(train_df, "train")
-    _check_no_inf_nan_numeric(val_df, "validation")
-    _check_no_inf_nan_numeric(inf_df, "inference")
-
-    # --- Optional: churn domain check ---
-    if not set(train_df[TARGET_COL].unique()).issubset({0, 1}):
-        raise ValueError("[train] churn must be in {0,1}")
-    if not set(val_df[TARGET_COL].unique()).issubset({0, 1}):
-        raise ValueError("[validation] churn must be in {0,1}")
-
+    _check_no_overlap(TRAIN_FILE, VALIDATION_FILE)
+
+    # --- Basic stats & per-dataset rules ---
+    datasets = [
+        (TRAIN_FILE, train_schema, "train", True),
+        (VALIDATION_FILE, val_schema, "validation", True),
+        (INFERENCE_FILE, inf_schema, "inference", False),
+    ]
+    reports = []
+    for path, schema, name, has_target in datasets:
+        _log_basic_stats(path, name, has_target)
+        report = validate_parquet(path, _dataset_rules(schema, has_target), id_col=ID_COL,
+                                  fail_fast=args.fail_fast, name=name)
+        reports.append(report.assign(rule=f"{name}." + report["rule"]))
+
+    raise_on_violations(pd.concat(reports, ignore_index=True), "datasets")
     logger.info("Dataset checks passed.")
 
 
@@ -1,9 +1,16 @@
 # coding: utf-8
 from typing import Tuple
 
+import numpy as np
 import pandas as pd
+from loguru import logger
 from sklearn.model_selection import train_test_split
 
+# Split salt (pandas hash key, 16 bytes). Changing it reshuffles every customer.
+SPLIT_KEY = "telco-split-v001"
+# Resolution of the validation share: test_size is rounded to 1 / SPLIT_BUCKETS
+SPLIT_BUCKETS = 10_000
+
 
 def stratified_split(
         df: pd.DataFrame,
@@ -18,3 +25,60 @@ def stratified_split(
         random_state=random_state,
     )
     return train_df, val_df
+
+
+def validation_mask(ids: pd.Series, test_size: float = 0.2, key: str = SPLIT_KEY) -> np.ndarray:
+    """
+    Stable train/validation assignment of each id: True for validation.
+
+    The assignment depends only on the id (and the salt), never on which other
+    customers are present, so a customer keeps its side across runs and
+    snapshots. This is not a stratified split: the hash ignores the label, so
+    each churn class gets `test_size` of its customers only in expectation and
+    per-class shares drift by sampling noise on small inputs (see the ratios
+    logged by `hash_split`). In exchange a label change never moves a customer.
+
+    :param ids: customer ids
+    :param test_size: validation share in (0, 1)
+    :param key: 16-character hash salt
+    :return: boolean mask aligned with `ids`
+    """
+
+    if not 0 < test_size < 1:
+        raise ValueError(f"test_size must be in (0, 1), got {test_size}")
+    h = pd.util.hash_pandas_object(ids.astype("string"), index=False, hash_key=key).to_numpy()
+    return (h % SPLIT_BUCKETS) < round(test_size * SPLIT_BUCKETS)
+
+
+def _log_split_ratios(counts: pd.DataFrame, target: str) -> None:
+    for label, row in counts.iterrows():
+        total = row["train"] + row["validation"]
+        logger.info(
+            f"[hash split] {target}={label}: train={row['train']}, validation={row['validation']}, "
+            f"validation_share={row['validation'] / max(total, 1):.4f}"
+        )
+
+
+def _split_counts(labels: pd.Series, is_val: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame({
+        "train": labels[~is_val].value_counts(),
+        "validation": labels[is_val].value_counts(),
+    }).fillna(0).astype("int64")
+
+
+def hash_split(
+        df: pd.DataFrame,
+        target: str,
+        test_size: float = 0.2,
+        id_col: str = "customer_id",
+        key: str = SPLIT_KEY,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Deterministic hash split of an in-memory frame (see `validation_mask`).
+    Rows keep their original order.
+    """
+
+    is_val = validation_mask(df[id_col], test_size, key)
+    _log_split_ratios(_split_counts(df[target], is_val), target)
+    return df[~is_val], df[is_val]
+
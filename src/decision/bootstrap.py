@@ -0,0 +1,292 @@
+# coding: utf-8
+import argparse
+import math
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from decision.top_k import BENEFIT, COST, NO_PEOPLE_CONTACTED_LIST, PRED_FILE, gain_curve, optimal_k, rank_by_score
+from log_utils import log_dataframe
+
+__all__ = [
+    "k_grid",
+    "poisson_weights",
+    "policy_bands",
+    "random_policy_churners",
+    "top_k_bootstrap_churners",
+]
+
+N_REPLICATES = 2_000
+ALPHA = 0.05
+SEED = 42
+
+# Upper bound on the (replicates x customers) working arrays of one chunk
+CHUNK_BYTES = 256 * 1024 ** 2
+
+# Results are (replicates x K); without explicit `ks` the K values are a grid
+# of this many points, so memory does not grow with the number of customers
+K_GRID_POINTS = 200
+
+# Random policies on K grids sparser than this fraction of n are drawn per
+# K segment (multivariate hypergeometric) instead of by full permutations
+SPARSE_K_RATIO = 0.25
+
+# Poisson(1) weights by inverse-CDF lookup on 16-bit uniforms: several times
+# faster than `Generator.poisson`, probabilities exact to 2 ** -16
+POISSON_BITS = 16
+
+BAND_COLUMNS = [
+    "k",
+    "top_k_net_gain",
+    "top_k_lo",
+    "top_k_hi",
+    "random_net_gain",
+    "random_lo",
+    "random_hi",
+]
+
+
+def _poisson_table(bits: int = POISSON_BITS) -> np.ndarray:
+    cdf = np.cumsum([math.exp(-1.0) / math.factorial(k) for k in range(20)])
+    u = (np.arange(2 ** bits) + 0.5) / 2 ** bits
+    return np.searchsorted(cdf, u).astype("uint8")
+
+
+POISSON_TABLE = _poisson_table()
+
+
+def poisson_weights(rng: np.random.Generator, shape) -> np.ndarray:
+    """
+    Poisson(1) bootstrap weights (uint8), see POISSON_BITS.
+    """
+
+    return POISSON_TABLE[rng.integers(0, 2 ** POISSON_BITS, shape, dtype="uint16")]
+
+
+def _chunks(n_replicates: int, n_rows: int, bytes_per_cell: int, chunk_bytes: int):
+    size = max(1, chunk_bytes // max(n_rows * bytes_per_cell, 1))
+    for start in range(0, n_replicates, size):
+        yield min(size, n_replicates - start)
+
+
+def k_grid(n: int, points: int = K_GRID_POINTS, extra=NO_PEOPLE_CONTACTED_LIST) -> np.ndarray:
+    """
+    Evenly spaced K values in [1, n] plus the `extra` ones that fit.
+
+    :param n: number of customers
+    :param points: grid size
+    :param extra: K values always included (e.g. the notebook's K list)
+    :return: sorted unique int64 array
+    """
+
+    grid = np.linspace(1, n, min(points, n)).round().astype("int64")
+    extra = np.asarray(extra, dtype="int64")
+    return np.unique(np.concatenate([grid, extra[(extra >= 1) & (extra <= n)]]))
+
+
+def _check_ks(ks, n: int) -> np.ndarray:
+    # Every K (1..n) only when asked for explicitly: the result is replicates x K
+    ks = k_grid(n) if ks is None else np.asarray(ks, dtype="int64")
+    if len(ks) and (ks.min() < 1 or ks.max() > n):
+        raise ValueError(f"K must be in [1, {n}], got min {ks.min()} / max {ks.max()}")
+    return ks
+
+
+def random_policy_churners(
+        y: np.ndarray,
+        ks=None,
+        n_replicates: int = N_REPLICATES,
+        seed: int = SEED,
+        chunk_bytes: int = CHUNK_BYTES,
+) -> np.ndarray:
+    """
+    Churners reached by contacting K random customers, for every K at once
+    (`simulate_random` draws one `df.sample(k)` per K instead).
+
+    On a sparse K grid the churner counts of the segments between
+    consecutive K are drawn jointly (multivariate hypergeometric, exactly the
+    distribution of a random permutation), so the cost is replicates x K and
+    not replicates x customers. On a dense grid each replicate is one random
+    permutation of the labels and its cumulative sum.
+
+    Replicates are processed in chunks of at most `chunk_bytes` of working
+    memory; only the (n_replicates, len(ks)) result is kept, so pass every
+    K (`np.arange(1, n + 1)`) only when the full matrix is really wanted.
+
+    :param y: true labels (0/1)
+    :param ks: K values (default: `k_grid(n)`)
+    :param n_replicates: number of random policies
+    :param seed: random seed
+    :param chunk_bytes: working memory bound per chunk
+    :return: int32 array (n_replicates, len(ks))
+    """
+
+    y = np.asarray(y, dtype="int8")
+    n = len(y)
+    ks = _check_ks(ks, n)
+    rng = np.random.default_rng(seed)
+    out = np.empty((n_replicates, len(ks)), dtype="int32")
+
+    if len(ks) < SPARSE_K_RATIO * n:
+        grid, inverse = np.unique(ks, return_inverse=True)
+        segments = np.diff(np.concatenate([[0], grid, [n]]))
+        start = 0
+        for size in _chunks(n_replicates, len(segments), 16, chunk_bytes):
+            counts = rng.multivariate_hypergeometric(segments, int(y.sum()), size=size, method="marginals")
+            out[start:start + size] = np.cumsum(counts[:, :-1], axis=1)[:, inverse]
+            start += size
+        return out
+
+    start = 0
+    # int8 permuted labels + int32 cumulative sum per cell
+    for size in _chunks(n_replicates, n, 5, chunk_bytes):
+        perm = rng.permuted(np.broadcast_to(y, (size, n)), axis=1)
+        out[start:start + size] = np.cumsum(perm, axis=1, dtype="int32")[:, ks - 1]
+        start += size
+    return out
+
+
+def top_k_bootstrap_churners(
+        y: np.ndarray,
+        proba: np.ndarray,
+        ks=None,
+        n_replicates: int = N_REPLICATES,
+        seed: int = SEED,
+        chunk_bytes: int = CHUNK_BYTES,
+) -> np.ndarray:
+    """
+    Poisson bootstrap of the top-K policy: every replicate reweights the
+    customers with Poisson(1) counts (`poisson_weights`, a resample of the
+    population with replacement) and contacts the K highest-scored resampled
+    customers.
+
+    The ranking is computed once. Per replicate, cumulative weights along
+    the ranking locate the K-th contacted customer (`searchsorted`, batched
+    over replicates by offsetting each row), and cumulative weighted labels
+    give the churners reached, counting the K-th customer's copies only
+    partially.
+
+    :param y: true labels (0/1)
+    :param proba: churn scores
+    :param ks: K values (default: `k_grid(n)`)
+    :param n_replicates: number of bootstrap replicates
+    :param seed: random seed
+    :param chunk_bytes: working memory bound per chunk
+    :return: int64 array (n_replicates, len(ks))
+    """
+
+    y = np.asarray(y)
+    if len(y) != len(proba):
+        raise ValueError(f"y and proba lengths differ: {len(y)} != {len(proba)}")
+    ks = _check_ks(ks, len(y))
+    y_ranked = y[rank_by_score(np.asarray(proba))].astype("uint8")
+    n = len(y_ranked)
+    rng = np.random.default_rng(seed)
+
+    out = np.empty((n_replicates, len(ks)), dtype="int64")
+    start = 0
+    # uint16 uniforms, uint8 weights, int64 cumulative weights / churners per cell
+    for size in _chunks(n_replicates, n, 20, chunk_bytes):
+        w = poisson_weights(rng, (size, n))
+        cum_y = np.cumsum(w * y_ranked, axis=1, dtype="int64")
+        cum_w = np.cumsum(w, axis=1, dtype="int64")
+        del w
+
+        # Rows are increasing, so offsetting row r by r * span makes the
+        # flattened array sorted: one searchsorted for all replicates
+        span = int(cum_w[:, -1].max()) + int(ks.max()) + 1
+        offsets = np.arange(size, dtype="int64")[:, None] * span
+        cum_w += offsets
+        flat = np.searchsorted(cum_w.ravel(), (ks[None, :] + offsets).ravel()).reshape(size, len(ks))
+        rows = np.arange(size)[:, None]
+        pos = np.minimum(flat - rows * n, n - 1)
+
+        excess = np.maximum(cum_w[rows, pos] - offsets - ks[None, :], 0)
+        out[start:start + size] = cum_y[rows, pos] - excess * y_ranked[pos]
+        start += size
+    return out
+
+
+def policy_bands(
+        y: np.ndarray,
+        proba: np.ndarray,
+        ks=None,
+        cost: float = COST,
+        benefit: float = BENEFIT,
+        n_replicates: int = N_REPLICATES,
+        alpha: float = ALPHA,
+        seed: int = SEED,
+        chunk_bytes: int = CHUNK_BYTES,
+) -> pd.DataFrame:
+    """
+    Net gain confidence bands of the top-K and random policies for every K.
+
+    top_k_*: observed top-K net gain with a Poisson bootstrap
+             (1 - alpha) percentile interval.
+    random_*: mean net gain of random K-customer policies with its
+              (1 - alpha) percentile interval.
+
+    :param y: true labels (0/1)
+    :param proba: churn scores
+    :param ks: K values (default: `k_grid(n)`)
+    :return: DataFrame with BAND_COLUMNS, one row per K
+
+    Memory is (n_replicates x len(ks)) on top of the chunked working arrays;
+    the default K grid keeps it independent of the number of customers.
+    """
+
+    ks = _check_ks(ks, len(y))
+    q = [alpha / 2, 1 - alpha / 2]
+
+    y_ranked = np.asarray(y)[rank_by_score(np.asarray(proba))]
+    observed = np.cumsum(y_ranked, dtype="int64")[ks - 1]
+    top_k = top_k_bootstrap_churners(y, proba, ks, n_replicates, seed, chunk_bytes)
+    random = random_policy_churners(y, ks, n_replicates, seed + 1, chunk_bytes)
+
+    top_lo, top_hi = np.quantile(top_k, q, axis=0)
+    rnd_lo, rnd_hi = np.quantile(random, q, axis=0)
+    total_cost = ks * cost
+    return pd.DataFrame({
+        "k": ks,
+        "top_k_net_gain": observed * benefit - total_cost,
+        "top_k_lo": top_lo * benefit - total_cost,
+        "top_k_hi": top_hi * benefit - total_cost,
+        "random_net_gain": random.mean(axis=0) * benefit - total_cost,
+        "random_lo": rnd_lo * benefit - total_cost,
+        "random_hi": rnd_hi * benefit - total_cost,
+    }, columns=BAND_COLUMNS)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Bootstrap confidence bands for top-K and random policies.")
+    parser.add_argument("--predictions", default=str(PRED_FILE))
+    parser.add_argument("--replicates", type=int, default=N_REPLICATES)
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--k-points", type=int, default=K_GRID_POINTS, help="size of the K grid")
+    parser.add_argument("--all-k", action="store_true",
+                        help="bands at every K = 1..n (memory grows with replicates x customers)")
+    parser.add_argument("--out", default=None, help="optional parquet path for the bands")
+    args = parser.parse_args(argv)
+
+    df = pd.read_parquet(args.predictions, columns=["churn", "p_churn"])
+    y, proba = df["churn"].to_numpy(), df["p_churn"].to_numpy()
+
+    # The optimal K comes from the exact curve (no replicates), then gets a band too
+    best_k = optimal_k(gain_curve(y, proba))["k"]
+    ks = np.arange(1, len(df) + 1) if args.all_k else np.union1d(k_grid(len(df), args.k_points), [best_k])
+    bands = policy_bands(y, proba, ks, n_replicates=args.replicates, alpha=args.alpha)
+
+    table = bands[bands["k"].isin(NO_PEOPLE_CONTACTED_LIST)]
+    log_dataframe(table, f"net gain bands ({1 - args.alpha:.0%}, {args.replicates} replicates)", max_rows=len(table))
+    best = bands[bands["k"] == best_k].iloc[0]
+    logger.info(f"Optimal K: {best_k}, net gain {best['top_k_net_gain']:.1f} "
+                f"[{best['top_k_lo']:.1f}, {best['top_k_hi']:.1f}]")
+
+    if args.out:
+        bands.to_parquet(args.out, index=False)
+        logger.info(f"Saved bands to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,148 @@
 # coding: utf-8
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import pandas as pd
+import pyarrow.parquet as pq
+from loguru import logger
 
 from constants import DATA
-from feature_views import (
-    build_customer_profile_features,
-    build_contract_service_features,
-    build_tenure_billing_features
-)
+from features.feature_views import FEATURE_VIEWS
 
 IN_FILE = DATA / "staging" / "telco_customers_clean.parquet"
 OUT_FILE = DATA / "features" / "telco_customer_features.parquet"
 
+ID_COL = "customer_id"
 
-def build_features(df: pd.DataFrame) -> pd.DataFrame:
-    base = df[["customer_id"]].copy()
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+def assemble_views(df: pd.DataFrame, views: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Column-concatenate row-aligned feature views next to the entity key.
+
+    Every view is computed from `df` and keeps its row order and index, so
+    alignment is verified once here instead of being re-derived by hash joins
+    on `customer_id`.
+
+    :param df: source frame the views were computed from (needs `customer_id`)
+    :param views: feature views, each indexed like `df`
+    :return:
+    """
+
+    for view in views:
+        if not view.index.equals(df.index):
+            raise ValueError(f"Feature view {list(view.columns)} is not row-aligned with the source")
 
-    df_profile = build_customer_profile_features(df)
-    df_contract = build_contract_service_features(df)
-    df_billing = build_tenure_billing_features(df)
+    seen = {ID_COL}
+    for view in views:
+        dup = seen & set(view.columns)
+        if dup:
+            raise ValueError(f"Feature column(s) produced by more than one view: {sorted(dup)}")
+        seen |= set(view.columns)
 
-    out = (
-        base
-        .merge(df_profile, on="customer_id", how="left", validate="one_to_one")
-        .merge(df_contract, on="customer_id", how="left", validate="one_to_one")
-        .merge(df_billing, on="customer_id", how="left", validate="one_to_one")
-    )
+    base = pd.DataFrame({ID_COL: df[ID_COL].astype("string")}, index=df.index)
+    out = pd.concat([base, *views], axis=1, copy=False)
+    return out.reset_index(drop=True)
 
+
+def compute_view(name: str, source) -> pd.DataFrame:
+    """
+    Compute one registered view from a clean DataFrame or parquet path.
+    A path is read with column projection on the view's declared inputs.
+
+    :param name: key in FEATURE_VIEWS
+    :param source: clean DataFrame, or path to the clean parquet
+    :return:
+    """
+
+    spec = FEATURE_VIEWS[name]
+    if isinstance(source, pd.DataFrame):
+        df = source[spec["inputs"]]
+    else:
+        df = pd.read_parquet(source, columns=spec["inputs"])
+
+    out = spec["build"](df)
+    if list(out.columns) != spec["outputs"]:
+        raise ValueError(f"View `{name}` produced {list(out.columns)}, declared {spec['outputs']}")
     return out
 
 
-def main():
-    df = pd.read_parquet(IN_FILE)
-    out = build_features(df)
+def compute_views(source, names=None, executor: str = "thread", max_workers: int | None = None) -> dict:
+    """
+    Compute independent feature views concurrently.
+
+    :param source: clean DataFrame (thread executor only), or parquet path
+    :param names: views to compute, defaults to every registered view
+    :param executor: "thread" or "process"
+    :param max_workers: pool size, defaults to one worker per view
+    :return: {name: view DataFrame}, in registry order
+    """
+
+    names = list(FEATURE_VIEWS) if names is None else list(names)
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor `{executor}`, expected one of {list(EXECUTORS)}")
+
+    with EXECUTORS[executor](max_workers=max_workers or len(names)) as pool:
+        futures = {name: pool.submit(compute_view, name, source) for name in names}
+        return {name: fut.result() for name, fut in futures.items()}
+
+
+def build_features(df: pd.DataFrame) -> pd.DataFrame:
+    views = compute_views(df)
+    return assemble_views(df, list(views.values()))
+
+
+def build_features_from_parquet(path=IN_FILE, executor: str = "thread", max_workers: int | None = None) -> pd.DataFrame:
+    """
+    Build the feature table straight from the clean parquet: each view reads
+    only its declared input columns, views run concurrently.
+    """
+
+    views = compute_views(path, executor=executor, max_workers=max_workers)
+    keys = pd.read_parquet(path, columns=[ID_COL])
+    return assemble_views(keys, list(views.values()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Phase 3 feature table.")
+    parser.add_argument("--executor", choices=list(EXECUTORS), default="thread")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--incremental", action="store_true",
+                        help="refresh the feature store for new/changed/deleted customers only")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help="with --incremental: rebuild the store from scratch (after feature code changes)")
+    args = parser.parse_args(argv)
+
+    if args.incremental:
+        from features.feature_store import publish_store, refresh_store, store_rows
+
+        refresh_store(IN_FILE, full=args.full_refresh)
+        n_source = pq.ParquetFile(IN_FILE).metadata.num_rows
+        n_features = store_rows()
+        if n_features != n_source:
+            raise ValueError(f"Row count mismatch: staging={n_source} vs features={n_features}")
+        publish_store(OUT_FILE)
+        logger.info(f"Published feature store ({n_features} customers) -> {OUT_FILE}")
+        return
+
+    out = build_features_from_parquet(IN_FILE, executor=args.executor, max_workers=args.workers)
+    n_source = pd.read_parquet(IN_FILE, columns=[ID_COL]).shape[0]
 
-    if len(out) != len(df):
-        raise ValueError(f"Row count mismatch: staging={len(df)} vs features={len(out)}")
+    if len(out) != n_source:
+        raise ValueError(f"Row count mismatch: staging={n_source} vs features={len(out)}")
 
-    if out["customer_id"].duplicated().any():
+    if out[ID_COL].duplicated().any():
         raise ValueError("Duplicate customer_id found in feature output")
 
+    if OUT_FILE.is_symlink():
+        # replace a published feature store link instead of writing through it
+        OUT_FILE.unlink()
     out.to_parquet(OUT_FILE, index=False)
+    logger.info(f"Built {len(FEATURE_VIEWS)} feature views for {len(out)} customers -> {OUT_FILE}")
 
 
 if __name__ == '__main__':
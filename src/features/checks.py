@@ -1,9 +1,12 @@
 # coding: utf-8
-import numpy as np
-import pandas as pd
+import argparse
+
+import pyarrow.parquet as pq
 from loguru import logger
 
 from constants import DATA
+from validation.engine import raise_on_violations
+from validation.streaming import validate_parquet
 
 IN_FILE = DATA / "features" / "telco_customer_features.parquet"
 
@@ -25,42 +28,35 @@ REQUIRED_COLS = [
     "avg_monthly_charges",
 ]
 
-
-def main():
-    df = pd.read_parquet(IN_FILE)
-
-    # 1) Column presence
-    missing = [c for c in REQUIRED_COLS if c not in df.columns]
-    if missing:
-        raise ValueError(f"Missing required feature columns: {missing}")
-
+FEATURE_RULES = [
     # 2) Uniqueness
-    if df["customer_id"].isna().any():
-        raise ValueError("customer_id contains NULLs")
-
-    if df["customer_id"].duplicated().any():
-        raise ValueError("Duplicate customer_id found in feature table")
-
+    {"name": "customer_id_not_null", "kind": "not_null", "column": "customer_id"},
+    {"name": "customer_id_unique", "kind": "unique", "column": "customer_id"},
     # 3) Null checks (Phase 3 policy: features should be non-null)
-    null_counts = df[REQUIRED_COLS].isna().sum()
-    if (null_counts > 0).any():
-        bad = null_counts[null_counts > 0].sort_values(ascending=False)
-        raise ValueError(f"Unexpected NULLs in feature table:\n{bad}")
-
+    *[{"name": f"{c}_not_null", "kind": "not_null", "column": c} for c in REQUIRED_COLS if c != "customer_id"],
     # 4) Numeric sanity
-    if (df["tenure"] < 0).any():
-        raise ValueError("tenure has negative values")
+    {"name": "tenure_non_negative", "kind": "range", "column": "tenure", "min": 0},
+    {"name": "monthly_charges_non_negative", "kind": "range", "column": "monthly_charges", "min": 0},
+    # avg_monthly_charges must be finite
+    {"name": "avg_monthly_charges_finite", "kind": "finite", "column": "avg_monthly_charges"},
+    # num_internet_addons should be within [0, 6]
+    {"name": "num_internet_addons_range", "kind": "range", "column": "num_internet_addons", "min": 0, "max": 6},
+]
 
-    if (df["monthly_charges"] < 0).any():
-        raise ValueError("monthly_charges has negative values")
 
-    # avg_monthly_charges must be finite
-    if not np.isfinite(df["avg_monthly_charges"].to_numpy()).all():
-        raise ValueError("avg_monthly_charges contains inf or NaN")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Phase 3 feature checks.")
+    parser.add_argument("--fail-fast", action="store_true", help="stop at the first violated rule")
+    args = parser.parse_args(argv)
 
-    # num_internet_addons should be within [0, 6]
-    if ((df["num_internet_addons"] < 0) | (df["num_internet_addons"] > 6)).any():
-        raise ValueError("num_internet_addons out of expected range [0, 6]")
+    # 1) Column presence (schema only, no data read)
+    columns = pq.ParquetDataset(IN_FILE).schema.names
+    missing = [c for c in REQUIRED_COLS if c not in columns]
+    if missing:
+        raise ValueError(f"Missing required feature columns: {missing}")
+
+    report = validate_parquet(IN_FILE, FEATURE_RULES, fail_fast=args.fail_fast, name="features")
+    raise_on_violations(report, "features")
 
     logger.info("Feature checks passed.")
 
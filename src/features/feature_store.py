@@ -0,0 +1,299 @@
+# coding: utf-8
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from loguru import logger
+
+from constants import DATA
+from features.build_features import ID_COL, IN_FILE, assemble_views, compute_views
+from features.feature_views import FEATURE_VIEWS
+
+__all__ = [
+    "STORE_DIR",
+    "publish_store",
+    "read_store",
+    "refresh_store",
+    "store_rows",
+]
+
+STORE_DIR = DATA / "features" / "store"
+N_BUCKETS = 16
+
+# Store layout: `live/` holds one parquet file per bucket with exactly the
+# feature table schema (the published downstream output), `state/` the
+# per-customer bookkeeping, and the manifest the snapshot stat and per-bucket
+# digests of the last refresh.
+LIVE_DIR = "live"
+STATE_DIR = "state"
+MANIFEST = "_manifest.json"
+
+HASH_COL = "_source_hash"
+DELETED_COL = "_is_deleted"
+UPDATED_COL = "_updated_at"
+
+
+def _source_columns() -> list[str]:
+    """
+    Clean columns the registered views read; only these define "changed".
+    """
+
+    cols = [c for spec in FEATURE_VIEWS.values() for c in spec["inputs"]]
+    return list(dict.fromkeys(cols))
+
+
+def row_hashes(df: pd.DataFrame, columns: list[str]) -> np.ndarray:
+    """
+    Stable 64-bit content hash per row over `columns`.
+    Categorical columns hash by value, so vocabulary order does not matter.
+    """
+
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def bucket_of(ids: pd.Series, n_buckets: int = N_BUCKETS) -> np.ndarray:
+    return (pd.util.hash_pandas_object(ids, index=False).to_numpy() % n_buckets).astype("int64")
+
+
+def bucket_digests(hashes: np.ndarray, buckets: np.ndarray) -> dict[str, list[int]]:
+    """
+    Order-independent digest of each bucket's rows: [rows, wrapping sum, xor]
+    of the per-row hashes. Equal digests mean the bucket's source is unchanged.
+
+    :param hashes: uint64 row hashes (id and source columns)
+    :param buckets: bucket of each row
+    :return: {"NN": [rows, sum, xor]} for non-empty buckets
+    """
+
+    order = np.argsort(buckets, kind="stable")
+    sorted_buckets, sorted_hashes = buckets[order], hashes[order]
+    present, starts, counts = np.unique(sorted_buckets, return_index=True, return_counts=True)
+    if not len(present):
+        return {}
+    sums = np.add.reduceat(sorted_hashes, starts)
+    xors = np.bitwise_xor.reduceat(sorted_hashes, starts)
+    return {
+        f"{b:02d}": [int(n), int(s), int(x)]
+        for b, n, s, x in zip(present, counts, sums, xors)
+    }
+
+
+def _bucket_file(store_dir: Path, kind: str, bucket: int) -> Path:
+    return store_dir / kind / f"bucket-{bucket:02d}.parquet"
+
+
+def _read_bucket(store_dir: Path, kind: str, bucket: int) -> pd.DataFrame | None:
+    f = _bucket_file(store_dir, kind, bucket)
+    return pd.read_parquet(f) if f.exists() else None
+
+
+def _write_bucket(store_dir: Path, kind: str, bucket: int, df: pd.DataFrame) -> None:
+    f = _bucket_file(store_dir, kind, bucket)
+    f.parent.mkdir(parents=True, exist_ok=True)
+    tmp = f.with_name(f".{f.name}.tmp")
+    df.to_parquet(tmp, index=False)
+    tmp.replace(f)
+
+
+def _read_manifest(store_dir: Path) -> dict | None:
+    f = store_dir / MANIFEST
+    return json.loads(f.read_text()) if f.exists() else None
+
+
+def _write_manifest(store_dir: Path, manifest: dict) -> None:
+    f = store_dir / MANIFEST
+    tmp = f.with_name(f".{f.name}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp.replace(f)
+
+
+def _empty_state() -> pd.DataFrame:
+    return pd.DataFrame({
+        ID_COL: pd.Series(dtype="string"),
+        HASH_COL: pd.Series(dtype="uint64"),
+        DELETED_COL: pd.Series(dtype="bool"),
+        UPDATED_COL: pd.Series(dtype="datetime64[ns, UTC]"),
+    })
+
+
+def refresh_store(
+        clean_path=IN_FILE,
+        store_dir=STORE_DIR,
+        n_buckets: int = N_BUCKETS,
+        full: bool = False,
+) -> dict:
+    """
+    Incrementally refresh the feature store from a clean snapshot.
+
+    The store is partitioned into buckets by a hash of `customer_id`. A
+    snapshot whose size and mtime match the last refresh is skipped without
+    being read. Otherwise the view input columns are hashed per row and an
+    order-independent digest per bucket is compared with the manifest: only
+    buckets whose digest moved have their state read, their new or changed
+    customers recomputed and their files rewritten. Customers missing from
+    the snapshot are tombstoned (`_is_deleted=True`) in the bucket state and
+    dropped from the live features.
+
+    :param clean_path: clean staging parquet
+    :param store_dir: feature store root
+    :param n_buckets: number of hash partitions (fixed for the life of a store)
+    :param full: drop the store and recompute every customer (after a change
+                 to feature code)
+    :return: counts of new / changed / deleted / unchanged customers
+    """
+
+    store_dir = Path(store_dir)
+    if full and store_dir.exists():
+        shutil.rmtree(store_dir)
+
+    manifest = _read_manifest(store_dir) or {"n_buckets": n_buckets, "source": None, "buckets": {}}
+    if manifest["n_buckets"] != n_buckets:
+        raise ValueError(f"Store {store_dir} has {manifest['n_buckets']} buckets, got n_buckets={n_buckets}")
+
+    st = Path(clean_path).stat()
+    source = [st.st_size, st.st_mtime_ns]
+    if manifest["source"] == source:
+        stats = {
+            "new": 0,
+            "changed": 0,
+            "deleted": 0,
+            "unchanged": sum(d[0] for d in manifest["buckets"].values()),
+        }
+        logger.info(f"feature store: snapshot unchanged since last refresh {stats}")
+        return stats
+
+    source_cols = _source_columns()
+    src = pd.read_parquet(clean_path, columns=[ID_COL] + source_cols)
+    src[ID_COL] = src[ID_COL].astype("string")
+    src_hash = row_hashes(src, source_cols)
+    src_bucket = bucket_of(src[ID_COL], n_buckets)
+    digests = bucket_digests(row_hashes(src, [ID_COL] + source_cols), src_bucket)
+    stale = [b for b in range(n_buckets) if digests.get(f"{b:02d}") != manifest["buckets"].get(f"{b:02d}")]
+
+    now = pd.Timestamp.now(tz="UTC")
+    diffs = {}
+    for b in stale:
+        rows = np.flatnonzero(src_bucket == b)
+        ids = src[ID_COL].iloc[rows]
+        state = _read_bucket(store_dir, STATE_DIR, b)
+        state = _empty_state() if state is None else state
+        live = state[~state[DELETED_COL]]
+        stored_hash = pd.Series(live[HASH_COL].to_numpy(), index=pd.Index(live[ID_COL]))
+
+        known = ids.isin(stored_hash.index).to_numpy()
+        previous = stored_hash.reindex(ids).to_numpy()
+        is_new = ~known
+        is_changed = known & (previous != src_hash[rows])
+        deleted_ids = live.loc[~live[ID_COL].isin(ids), ID_COL]
+        diffs[b] = (rows, is_new | is_changed, is_new, is_changed, state, deleted_ids)
+
+    stats = {
+        "new": sum(int(d[2].sum()) for d in diffs.values()),
+        "changed": sum(int(d[3].sum()) for d in diffs.values()),
+        "deleted": sum(len(d[5]) for d in diffs.values()),
+    }
+    stats["unchanged"] = len(src) - stats["new"] - stats["changed"]
+    logger.info(f"feature store diff: {stats}, {len(stale)}/{n_buckets} bucket(s) to check")
+
+    upsert_rows = np.concatenate([d[0][d[1]] for d in diffs.values()] or [np.empty(0, dtype="int64")])
+    if len(upsert_rows):
+        upsert = src.iloc[upsert_rows]
+        features = assemble_views(upsert, list(compute_views(upsert).values()))
+        features_bucket = src_bucket[upsert_rows]
+
+    rewritten = 0
+    for b, (rows, upserted, _, _, state, deleted_ids) in diffs.items():
+        if not upserted.any() and deleted_ids.empty:
+            continue
+        new_rows = features[features_bucket == b] if len(upsert_rows) else None
+        current = _read_bucket(store_dir, LIVE_DIR, b)
+        parts = []
+        if current is not None:
+            drop = current[ID_COL].isin(src[ID_COL].iloc[rows[upserted]]) | current[ID_COL].isin(deleted_ids)
+            parts.append(current[~drop])
+        if new_rows is not None and len(new_rows):
+            parts.append(new_rows)
+        _write_bucket(store_dir, LIVE_DIR, b, pd.concat(parts, ignore_index=True))
+
+        current_ids = src[ID_COL].iloc[rows]
+        updated = state.set_index(ID_COL)[UPDATED_COL].reindex(current_ids).reset_index(drop=True)
+        updated[upserted] = now
+        gone = state[~state[ID_COL].isin(current_ids)].copy()
+        tombstones = gone[ID_COL].isin(deleted_ids)
+        gone.loc[tombstones, DELETED_COL] = True
+        gone.loc[tombstones, UPDATED_COL] = now
+        current_state = pd.DataFrame({
+            ID_COL: current_ids.to_numpy(),
+            HASH_COL: src_hash[rows],
+            DELETED_COL: False,
+            UPDATED_COL: updated,
+        })
+        _write_bucket(store_dir, STATE_DIR, b, pd.concat([current_state, gone], ignore_index=True))
+        rewritten += 1
+
+    manifest["buckets"] = digests
+    manifest["source"] = source
+    _write_manifest(store_dir, manifest)
+    logger.info(f"feature store: rewrote {rewritten}/{n_buckets} bucket(s) in {store_dir}")
+    return stats
+
+
+def store_rows(store_dir=STORE_DIR) -> int:
+    """
+    Live customers in the store, from the parquet footers (no data read).
+    """
+
+    return sum(pq.ParquetFile(f).metadata.num_rows for f in Path(store_dir, LIVE_DIR).glob("bucket-*.parquet"))
+
+
+def publish_store(out_file, store_dir=STORE_DIR) -> None:
+    """
+    Publish the live features as the feature table: `out_file` becomes a
+    relative symlink to the store's `live/` dataset directory (zero copy), so a
+    refresh that rewrote two buckets costs two bucket writes downstream too.
+    Readers see a parquet dataset in bucket order, not in snapshot order; every
+    consumer joins on `customer_id`.
+
+    :param out_file: feature table path (e.g. build_features.OUT_FILE)
+    :param store_dir: feature store root
+    """
+
+    out_file = Path(out_file)
+    live = Path(store_dir) / LIVE_DIR
+    if not any(live.glob("bucket-*.parquet")):
+        raise ValueError(f"Feature store is empty: {store_dir}")
+    tmp = out_file.with_name(f".{out_file.name}.tmp")
+    tmp.unlink(missing_ok=True)
+    tmp.symlink_to(os.path.relpath(live, out_file.parent), target_is_directory=True)
+    if out_file.is_dir() and not out_file.is_symlink():
+        shutil.rmtree(out_file)
+    tmp.replace(out_file)
+
+
+def read_store(store_dir=STORE_DIR, include_deleted: bool = False) -> pd.DataFrame:
+    """
+    Read the feature table back from the store (live customers by default).
+
+    Rows come in bucket order (hash of `customer_id`), then insertion order
+    within a bucket, not in the order of the clean snapshot.
+
+    :param store_dir: feature store root
+    :param include_deleted: return every customer ever seen with the internal
+                            columns; tombstoned customers have no features
+    :return:
+    """
+
+    store_dir = Path(store_dir)
+    parts = sorted((store_dir / LIVE_DIR).glob("bucket-*.parquet"))
+    if not parts:
+        raise ValueError(f"Feature store is empty: {store_dir}")
+    df = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+    if not include_deleted:
+        return df
+    state = pd.concat([pd.read_parquet(p) for p in sorted((store_dir / STATE_DIR).glob("bucket-*.parquet"))],
+                      ignore_index=True)
+    return state.merge(df, on=ID_COL, how="left", validate="one_to_one")
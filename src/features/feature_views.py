@@ -10,30 +10,35 @@ INTERNET_ADDON_COLS = [
     "streaming_movies",
 ]
 
+TENURE_BUCKET_BINS = [0, 6, 12, 24, 10_000]
+TENURE_BUCKET_LABELS = [
+    "tenure_new",
+    "tenure_early",
+    "tenure_stable",
+    "tenure_loyal",
+]
+
 
 def build_customer_profile_features(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Customer profile features.
+    Customer profile features, row-aligned with `df` (same index, no key column).
     Output columns:
-      - customer_id
       - is_senior
       - has_partner
       - has_dependents
     """
     out = pd.DataFrame({
-        "customer_id": df["customer_id"].astype("string"),
         "is_senior": df["senior_citizen"].astype("int8"),
         "has_partner": df["partner"].astype("int8"),
         "has_dependents": df["dependents"].astype("int8"),
-    })
+    }, index=df.index)
     return out
 
 
 def build_contract_service_features(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Contract & Services features
+    Contract & Services features, row-aligned with `df` (same index, no key column).
     Output columns:
-    - customer_id
     - is_month_to_month
     - contract_type
     - has_phone_service
@@ -43,22 +48,20 @@ def build_contract_service_features(df: pd.DataFrame) -> pd.DataFrame:
     """
 
     out = pd.DataFrame({
-        "customer_id": df["customer_id"].astype("string"),
         "is_month_to_month": df["contract"].eq("Month-to-month").astype("int8"),
         "contract_type": df["contract"].astype("category"),
         "has_phone_service": df["phone_service"].eq("Yes").astype("int8"),
         "has_multiple_lines": df["multiple_lines"].eq("Yes").astype("int8"),
         "has_internet_service": df["internet_service"].ne("No").astype("int8"),
         "num_internet_addons": (df[INTERNET_ADDON_COLS].eq("Yes")).sum(axis=1).astype("int16"),
-    })
+    }, index=df.index)
     return out
 
 
 def build_tenure_billing_features(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Tenure & Billing Proxies features
+    Tenure & Billing Proxies features, row-aligned with `df` (same index, no key column).
     Output columns:
-    - customer_id
     - tenure
     - tenure_bucket
     - monthly_charges
@@ -72,22 +75,47 @@ def build_tenure_billing_features(df: pd.DataFrame) -> pd.DataFrame:
     avg = (total / tenure_float).where(tenure_int > 0, 0.0)
 
     out = pd.DataFrame({
-        "customer_id": df["customer_id"].astype("string"),
         "tenure": tenure_int,
         "tenure_bucket": pd.cut(
             tenure_int,
-            bins=[0, 6, 12, 24, 10_000],
-            labels=[
-                "tenure_new",
-                "tenure_early",
-                "tenure_stable",
-                "tenure_loyal",
-            ],
+            bins=TENURE_BUCKET_BINS,
+            labels=TENURE_BUCKET_LABELS,
             right=False,
             include_lowest=True,
         ).astype("category"),
         "monthly_charges": df["monthly_charges"].astype("float64"),
         "total_charges": total,
         "avg_monthly_charges": avg.astype("float64"),
-    })
+    }, index=df.index)
     return out
+
+
+# --- Feature view registry ---
+# Each view declares the clean columns it reads and the feature columns it
+# writes. The scheduler in `build_features` reads only `inputs` for each view
+# (parquet column projection) and computes views concurrently; outputs are
+# checked against the declaration. Register new views here.
+FEATURE_VIEWS = {
+    "customer_profile": {
+        "inputs": ["senior_citizen", "partner", "dependents"],
+        "outputs": ["is_senior", "has_partner", "has_dependents"],
+        "build": build_customer_profile_features,
+    },
+    "contract_service": {
+        "inputs": ["contract", "phone_service", "multiple_lines", "internet_service", *INTERNET_ADDON_COLS],
+        "outputs": [
+            "is_month_to_month",
+            "contract_type",
+            "has_phone_service",
+            "has_multiple_lines",
+            "has_internet_service",
+            "num_internet_addons",
+        ],
+        "build": build_contract_service_features,
+    },
+    "tenure_billing": {
+        "inputs": ["tenure", "monthly_charges", "total_charges"],
+        "outputs": ["tenure", "tenure_bucket", "monthly_charges", "total_charges", "avg_monthly_charges"],
+        "build": build_tenure_billing_features,
+    },
+}
@@ -0,0 +1,225 @@
+# coding: utf-8
+import os
+import re
+from functools import lru_cache
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+from loguru import logger
+
+from ingestion.schemas import staging_schema
+from log_utils import log_dataframe
+from staging.domains import DOMAIN_VALUES, domain_categories, encode_domain_columns
+
+__all__ = [
+    "build_convert_options",
+    "failed_column",
+    "finalize_staging_table",
+    "iter_staging_tables",
+    "pandas_metadata",
+    "read_staging_table",
+]
+
+ARROW_TYPES = {
+    "string": pa.string(),
+    "integer": pa.int64(),
+    "float": pa.float64(),
+    "boolean": pa.bool_(),
+}
+
+# Pandas dtypes `apply_schema` produces for each arrow type
+PANDAS_TYPES = {
+    pa.string(): pd.StringDtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+}
+
+TRUE_VALUES = ["Yes", "yes", "1"]
+FALSE_VALUES = ["No", "no", "0"]
+
+# Arrow defaults plus the extra tokens pandas.read_csv treats as missing,
+# and a lone blank (seen in TotalCharges for tenure == 0 customers).
+NULL_VALUES = pacsv.ConvertOptions().null_values + ["<NA>", "None", " "]
+
+# Rough bytes per streaming batch; each batch becomes one parquet row group
+BLOCK_SIZE = 64 << 20
+
+_FAILED_COLUMN_RE = re.compile(r"In CSV column #(\d+)")
+
+
+def build_convert_options(schema=staging_schema, as_string=()) -> pacsv.ConvertOptions:
+    """
+    Translate a staging schema into pyarrow CSV ConvertOptions.
+
+    :param schema: staging schema (raw name -> {"name", "type"})
+    :param as_string: raw column names to read as plain strings (diagnostic fallback)
+    :return:
+    """
+
+    column_types = {
+        raw_name: pa.string() if raw_name in as_string else ARROW_TYPES[config["type"]]
+        for raw_name, config in schema.items()
+    }
+    return pacsv.ConvertOptions(
+        column_types=column_types,
+        include_columns=list(schema),
+        null_values=NULL_VALUES,
+        true_values=TRUE_VALUES,
+        false_values=FALSE_VALUES,
+        strings_can_be_null=True,
+    )
+
+
+def failed_column(err: pa.ArrowInvalid, schema) -> str | None:
+    """
+    Extract the raw column name from an arrow CSV conversion error.
+    """
+
+    match = _FAILED_COLUMN_RE.search(str(err))
+    if match is None:
+        return None
+    raw_names = list(schema)
+    idx = int(match.group(1))
+    return raw_names[idx] if idx < len(raw_names) else None
+
+
+def pandas_metadata(schema=staging_schema) -> dict:
+    """
+    Pandas metadata of the staging DataFrame: the dtypes `apply_schema`
+    produces (string/Int64/boolean/float64), with domain columns stored as
+    fixed-vocabulary categoricals.
+    """
+
+    return _pandas_metadata(tuple((config["name"], config["type"]) for config in schema.values()))
+
+
+@lru_cache(maxsize=None)
+def _pandas_metadata(columns_types: tuple) -> dict:
+    # Building the metadata goes through an empty DataFrame; cached so that
+    # small batches (online scoring) do not pay for it on every call.
+    columns = {}
+    for name, type_ in columns_types:
+        if name in DOMAIN_VALUES:
+            dtype = pd.CategoricalDtype(domain_categories(name))
+        else:
+            dtype = PANDAS_TYPES.get(ARROW_TYPES[type_], "float64")
+        columns[name] = pd.Series(dtype=dtype)
+    return pa.Table.from_pandas(pd.DataFrame(columns), preserve_index=False).schema.metadata
+
+
+def finalize_staging_table(table: pa.Table, schema=staging_schema) -> pa.Table:
+    """
+    Dictionary-encode domain columns with their fixed vocabulary and attach
+    the staging pandas metadata. Shared by both ingestion engines.
+    """
+
+    table = encode_domain_columns(table)
+    return table.replace_schema_metadata(pandas_metadata(schema))
+
+
+def _to_table(data, schema, as_string) -> pa.Table:
+    """
+    Rename a typed arrow batch/table to staging names and validate it.
+    Columns in `as_string` go through the legacy per-column conversion in
+    `apply_schema`, which logs (or raises on) the offending rows.
+    """
+
+    from ingestion.load_raw import apply_schema
+
+    table = pa.Table.from_batches([data]) if isinstance(data, pa.RecordBatch) else data
+    table = table.rename_columns([schema[c]["name"] for c in table.column_names])
+
+    if as_string:
+        fallback_schema = {v["name"]: v for k, v in schema.items() if k in as_string}
+        context = [c for c in ("customer_id", "tenure") if c not in fallback_schema]
+        fallback = table.select(list(fallback_schema) + context).to_pandas()
+        for name, config in fallback_schema.items():
+            # Float parsing treats "" as missing; other types expect NaN like pandas.read_csv
+            fill = "" if config["type"] == "float" else np.nan
+            fallback[name] = fallback[name].astype(object).where(fallback[name].notna(), fill)
+        fallback = apply_schema(fallback, fallback_schema)
+        for name, config in fallback_schema.items():
+            arr = pa.array(fallback[name], type=ARROW_TYPES[config["type"]], from_pandas=True)
+            table = table.set_column(table.column_names.index(name), name, arr)
+
+    for raw_name, config in schema.items():
+        name = config["name"]
+        if raw_name in as_string or table.column(name).null_count == 0:
+            continue
+        if config["type"] == "boolean":
+            bad = table.filter(pc.is_null(table.column(name)))["customer_id"][:5].to_pylist()
+            raise ValueError(f"{name}: unmapped boolean values (NULL) for customers {bad}")
+        if config["type"] == "float":
+            sample = table.filter(pc.is_null(table.column(name))).select(["customer_id", "tenure", name])
+            log_dataframe(sample.to_pandas(), f"Float parse produced NaNs in `{name}`", level=logger.warning)
+
+    return finalize_staging_table(table, schema)
+
+
+def iter_staging_tables(
+        raw_file,
+        schema=staging_schema,
+        block_size: int = BLOCK_SIZE,
+        as_string=(),
+) -> Iterator[pa.Table]:
+    """
+    Stream the raw CSV as typed staging tables, one per arrow batch.
+
+    Parsing, casting and boolean mapping happen natively in pyarrow.
+    Raises `pa.ArrowInvalid` when a column fails to convert; use
+    `failed_column` to find it and restart with that column in `as_string`.
+
+    :param raw_file: raw CSV extract
+    :param schema: staging schema
+    :param block_size: bytes per arrow batch
+    :param as_string: raw column names routed through the legacy diagnostic path
+    :return:
+    """
+
+    reader = pacsv.open_csv(
+        raw_file,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=build_convert_options(schema, as_string),
+    )
+    for batch in reader:
+        yield _to_table(batch, schema, as_string)
+
+
+def read_staging_table(raw_file, schema=staging_schema) -> pa.Table:
+    """
+    Read the whole raw CSV in one multithreaded arrow pass.
+
+    Columns that fail to convert are re-read as strings and converted by
+    the legacy diagnostic path; all other columns stay on the native path.
+
+    :param raw_file: raw CSV extract: path, bytes, or a readable file object
+                     (read once into memory, since a retry re-parses it)
+    :param schema: staging schema
+    :return: staging table, reads back with the same dtypes as `apply_schema`
+    """
+
+    if isinstance(raw_file, (str, os.PathLike)):
+        def source():
+            return raw_file
+    else:
+        data = raw_file.read() if hasattr(raw_file, "read") else raw_file
+
+        def source():
+            return pa.BufferReader(data)
+
+    as_string = set()
+    while True:
+        try:
+            table = pacsv.read_csv(source(), convert_options=build_convert_options(schema, as_string))
+        except pa.ArrowInvalid as err:
+            failed = failed_column(err, schema)
+            if failed is None or failed in as_string:
+                raise
+            logger.warning(f"Typed parse failed for `{failed}`, falling back to diagnostic path: {err}")
+            as_string.add(failed)
+        else:
+            return _to_table(table, schema, as_string)
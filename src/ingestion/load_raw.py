@@ -1,18 +1,35 @@
 # coding: utf-8
+import argparse
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from loguru import logger
 
 from constants import DATA
+from ingestion import arrow_csv
 from ingestion.schemas import staging_schema
 from log_utils import log_dataframe
 
-pd.set_option('display.max_columns', None)
-pd.set_option('display.max_rows', None)
-pd.set_option('display.width', 1000)
-pd.set_option('display.unicode.ambiguous_as_wide', True)
-pd.set_option('display.unicode.east_asian_width', True)
+__all__ = [
+    "apply_schema",
+    "load_raw",
+]
 
 RAW_FILE = DATA / "raw" / "WA_Fn-UseC_-Telco-Customer-Churn.csv"
+OUT_FILE = DATA / "staging" / "telco_customers_staging.parquet"
+
+# Rows per CSV chunk (and per parquet row group) in streaming mode.
+# Peak memory is bounded by this value instead of the size of the extract.
+CHUNK_SIZE = 500_000
+
+# "arrow": typed multithreaded pyarrow CSV parse driven by staging_schema
+# "pandas": generic parse + per-column `apply_schema` (the diagnostic path)
+ENGINES = ("arrow", "pandas")
 
 
 def apply_schema(df: pd.DataFrame, schema) -> pd.DataFrame:
@@ -30,7 +47,7 @@ def apply_schema(df: pd.DataFrame, schema) -> pd.DataFrame:
         new_name = config["name"]
         dtype = config["type"]
 
-        logger.info(f"handling {new_name} ...")
+        logger.debug(f"handling {new_name} ...")
         if dtype == "string":
             df[new_name] = df[new_name].astype("string")
 
@@ -69,7 +86,228 @@ def apply_schema(df: pd.DataFrame, schema) -> pd.DataFrame:
     return df
 
 
-df = pd.read_csv(RAW_FILE)
-df = apply_schema(df, staging_schema)
-log_dataframe(df, "loaded raw:", level=logger.warning)
-df.to_parquet(DATA / "staging" / "telco_customers_staging.parquet")
+def _iter_pandas_tables(raw_file, chunk_size: int):
+    for chunk in pd.read_csv(raw_file, chunksize=chunk_size):
+        table = pa.Table.from_pandas(apply_schema(chunk, staging_schema), preserve_index=False)
+        yield arrow_csv.finalize_staging_table(table, staging_schema)
+
+
+def _write_tables(tables, out_file) -> int:
+    """
+    Append staging tables as row groups of one parquet file.
+
+    Every table carries the same staging schema and pandas metadata, so the
+    file reads back exactly like a single-shot output.
+    """
+
+    writer = None
+    n_rows = 0
+    try:
+        for table in tables:
+            if writer is None:
+                log_dataframe(table.slice(0, 5).to_pandas(), "loaded raw (first chunk):", level=logger.warning)
+                writer = pq.ParquetWriter(out_file, table.schema)
+            writer.write_table(table)
+            n_rows += table.num_rows
+            logger.info(f"chunk written: rows={table.num_rows}, total={n_rows}")
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError("Raw file is empty")
+
+    return n_rows
+
+
+def load_raw_single_shot(raw_file=RAW_FILE, out_file=OUT_FILE, engine: str = "arrow") -> int:
+    """
+    Read the whole raw CSV in memory, apply the staging schema and write
+    a single-row-group staging parquet.
+
+    :param raw_file: raw CSV extract
+    :param out_file: staging parquet
+    :param engine: "arrow" or "pandas"
+    :return: number of rows written
+    """
+
+    if engine == "arrow":
+        table = arrow_csv.read_staging_table(raw_file, staging_schema)
+        log_dataframe(table.slice(0, 5).to_pandas(), "loaded raw:", level=logger.warning)
+        pq.write_table(table, out_file)
+        return table.num_rows
+
+    if engine != "pandas":
+        raise ValueError(f"Unknown engine `{engine}`, expected one of {ENGINES}")
+
+    df = apply_schema(pd.read_csv(raw_file), staging_schema)
+    log_dataframe(df, "loaded raw:", level=logger.warning)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(arrow_csv.finalize_staging_table(table, staging_schema), out_file)
+    return len(df)
+
+
+def load_raw_streaming(
+        raw_file=RAW_FILE,
+        out_file=OUT_FILE,
+        chunk_size: int = CHUNK_SIZE,
+        engine: str = "arrow",
+        block_size: int = arrow_csv.BLOCK_SIZE,
+) -> int:
+    """
+    Read the raw CSV in bounded chunks, apply the staging schema to each chunk
+    and append it as a row group to one parquet file.
+
+    With the arrow engine a column that fails the typed parse restarts the
+    stream with that column routed through the diagnostic path.
+
+    :param raw_file: raw CSV extract
+    :param out_file: staging parquet
+    :param chunk_size: rows per chunk (pandas engine)
+    :param engine: "arrow" or "pandas"
+    :param block_size: bytes per batch (arrow engine)
+    :return: number of rows written
+    """
+
+    if engine == "pandas":
+        return _write_tables(_iter_pandas_tables(raw_file, chunk_size), out_file)
+    if engine != "arrow":
+        raise ValueError(f"Unknown engine `{engine}`, expected one of {ENGINES}")
+
+    as_string = set()
+    while True:
+        tables = arrow_csv.iter_staging_tables(raw_file, staging_schema, block_size, as_string)
+        try:
+            return _write_tables(tables, out_file)
+        except pa.ArrowInvalid as err:
+            failed = arrow_csv.failed_column(err, staging_schema)
+            if failed is None or failed in as_string:
+                raise
+            logger.warning(f"Typed parse failed for `{failed}`, restarting with diagnostic path: {err}")
+            as_string.add(failed)
+            Path(out_file).unlink(missing_ok=True)
+
+
+def resolve_paths(paths) -> list[Path]:
+    """
+    Expand a path, a glob pattern or a list of them into sorted raw files.
+
+    :param paths: str / Path / iterable of str or Path, globs allowed
+    :return: de-duplicated, sorted list of existing files
+    """
+
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+
+    files = set()
+    for p in paths:
+        matches = glob.glob(str(p))
+        if not matches:
+            raise FileNotFoundError(f"No raw file matches `{p}`")
+        files.update(Path(m) for m in matches)
+    return sorted(files)
+
+
+def _ingest_one(raw_file, out_file, engine: str, streaming: bool, chunk_size: int) -> int:
+    """
+    Ingest one raw file into one parquet file (process-pool worker).
+    Writes to a temporary name first so a crashed worker never leaves
+    a truncated part behind.
+    """
+
+    out_file = Path(out_file)
+    tmp_file = out_file.with_name(f".{out_file.name}.tmp")
+    if streaming:
+        n_rows = load_raw_streaming(raw_file, tmp_file, chunk_size=chunk_size, engine=engine)
+    else:
+        n_rows = load_raw_single_shot(raw_file, tmp_file, engine=engine)
+    tmp_file.replace(out_file)
+    return n_rows
+
+
+def load_raw(
+        paths=RAW_FILE,
+        out_path=OUT_FILE,
+        engine: str = "arrow",
+        streaming: bool = True,
+        chunk_size: int = CHUNK_SIZE,
+        max_workers: int | None = None,
+) -> int:
+    """
+    Ingest one or many raw extracts into the staging layer.
+
+    A single input file is written to `out_path` as one parquet file.
+    Several inputs (e.g. daily shard drops) are ingested concurrently in a
+    process pool and written as a partitioned dataset: `out_path` becomes a
+    directory with one `part-NNNNN-<shard>.parquet` per input, readable as a
+    whole with `pd.read_parquet(out_path)`.
+
+    :param paths: raw file, glob pattern, or list of them
+    :param out_path: staging parquet file (single input) or dataset directory
+    :param engine: "arrow" or "pandas"
+    :param streaming: chunked ingestion with bounded memory per file
+    :param chunk_size: rows per chunk (pandas engine)
+    :param max_workers: process pool size, defaults to the number of CPUs
+    :return: total number of rows ingested
+    """
+
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine `{engine}`, expected one of {ENGINES}")
+
+    files = resolve_paths(paths)
+    out_path = Path(out_path)
+    start = time.perf_counter()
+
+    if len(files) == 1:
+        n_rows = _ingest_one(files[0], out_path, engine, streaming, chunk_size)
+    else:
+        if out_path.is_file():
+            raise ValueError(f"`{out_path}` is a file; a multi-file ingest needs a dataset directory")
+        out_path.mkdir(parents=True, exist_ok=True)
+        for stale in out_path.glob("part-*.parquet"):
+            stale.unlink()
+
+        part_files = [out_path / f"part-{i:05d}-{f.stem}.parquet" for i, f in enumerate(files)]
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(_ingest_one, f, part, engine, streaming, chunk_size)
+                for f, part in zip(files, part_files)
+            ]
+            n_rows = 0
+            for f, fut in zip(files, futures):
+                rows = fut.result()
+                logger.info(f"shard ingested: {f.name} rows={rows}")
+                n_rows += rows
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Ingested {n_rows} rows from {len(files)} file(s) in {elapsed:.2f}s with engine={engine} "
+        f"({n_rows / max(elapsed, 1e-9):,.0f} rows/sec) -> {out_path}"
+    )
+    return n_rows
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Ingest raw telco extracts into the staging layer.")
+    parser.add_argument("paths", nargs="*", default=[str(RAW_FILE)],
+                        help="raw CSV files or glob patterns (quote globs)")
+    parser.add_argument("--out", default=str(OUT_FILE),
+                        help="staging parquet file, or dataset directory for multiple inputs")
+    parser.add_argument("--engine", choices=ENGINES, default="arrow")
+    parser.add_argument("--single-shot", action="store_true", help="read each file fully in memory")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    load_raw(
+        args.paths,
+        args.out,
+        engine=args.engine,
+        streaming=not args.single_shot,
+        chunk_size=args.chunk_size,
+        max_workers=args.workers,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# coding: utf-8
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pyarrow.parquet as pq
+from loguru import logger
+
+from models import compiled_scorer
+from models.predict_baseline import ID_COL, INFERENCE_FILE, MODEL_FILE, OUT_FILE, load_scorer, score
+from validation.streaming import iter_pieces, read_piece
+
+__all__ = [
+    "predict_batch",
+]
+
+MANIFEST = "_manifest.json"
+
+# Scorer loaded once per worker process by `_init_worker`
+_SCORER = None
+
+
+def _init_worker(engine: str) -> None:
+    global _SCORER
+    _SCORER = load_scorer(engine)
+
+
+def _score_piece(piece: tuple[str, int], part_file: Path) -> int:
+    """
+    Score one row group and write it as one part file (tmp + rename, so a
+    part that exists is always complete).
+    """
+
+    columns = list(dict.fromkeys([_SCORER.get("id_col", ID_COL), *_SCORER["cat_cols"], *_SCORER["num_cols"]]))
+    out = score(_SCORER, read_piece(piece, columns=columns))
+    tmp = part_file.with_name(f".{part_file.name}.tmp")
+    out.to_parquet(tmp, index=False)
+    tmp.replace(part_file)
+    return len(out)
+
+
+def _model_files(engine: str) -> list[Path]:
+    """
+    Files `load_scorer(engine)` reads the model from.
+    """
+
+    if engine == "compiled" and compiled_scorer.COMPILED_DIR.exists():
+        return sorted(p for p in compiled_scorer.COMPILED_DIR.rglob("*") if p.is_file())
+    return [MODEL_FILE]
+
+
+def _file_stats(files) -> dict:
+    return {str(f): [os.stat(f).st_size, os.stat(f).st_mtime_ns] for f in files}
+
+
+def _input_manifest(pieces: list[tuple[str, int]], engine: str) -> dict:
+    files = sorted({f for f, _ in pieces})
+    return {
+        "engine": engine,
+        "pieces": [[f, i] for f, i in pieces],
+        "files": _file_stats(files),
+        # A retrain / recompile invalidates parts scored with the old model
+        "model": _file_stats(_model_files(engine)),
+    }
+
+
+def _prepare_parts_dir(parts_dir: Path, manifest: dict, resume: bool) -> None:
+    """
+    Keep finished parts only if they were produced from the same input
+    row groups with the same engine and model files; otherwise start from
+    scratch.
+    """
+
+    manifest_file = parts_dir / MANIFEST
+    if resume and manifest_file.exists() and json.loads(manifest_file.read_text()) == manifest:
+        return
+    if parts_dir.exists():
+        shutil.rmtree(parts_dir)
+    parts_dir.mkdir(parents=True)
+    manifest_file.write_text(json.dumps(manifest))
+
+
+def _merge_parts(part_files: list[Path], out_file: Path) -> int:
+    """
+    Concatenate the parts, in input order, into one parquet file with one
+    row group per part.
+    """
+
+    tmp = out_file.with_name(f".{out_file.name}.tmp")
+    writer = None
+    n_rows = 0
+    try:
+        for f in part_files:
+            table = pq.read_table(f)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, table.schema)
+            writer.write_table(table, row_group_size=max(table.num_rows, 1))
+            n_rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    tmp.replace(out_file)
+    return n_rows
+
+
+def predict_batch(
+        in_path=INFERENCE_FILE,
+        out_file=OUT_FILE,
+        engine: str = "compiled",
+        max_workers: int | None = None,
+        resume: bool = True,
+) -> int:
+    """
+    Score an inference parquet file or dataset directory row group by row
+    group in a process pool, with the scorer loaded once per worker.
+
+    Each row group is written as a part file under `<out_file>.parts/`; the
+    parts are then merged in input order into `out_file` (one row group per
+    input row group). After a crash, a re-run with `resume=True` only scores
+    the row groups without a finished part, as long as the input files,
+    engine and model files are unchanged.
+
+    :param in_path: inference parquet file or dataset directory
+    :param out_file: predictions parquet
+    :param engine: "compiled" or "sklearn"
+    :param max_workers: process pool size, defaults to the number of CPUs
+    :param resume: reuse finished parts of an interrupted run
+    :return: number of rows scored
+    """
+
+    out_file = Path(out_file)
+    parts_dir = out_file.with_name(f"{out_file.name}.parts")
+    pieces = iter_pieces(in_path)
+    if not pieces:
+        raise ValueError(f"No row groups found in {in_path}")
+
+    _prepare_parts_dir(parts_dir, _input_manifest(pieces, engine), resume)
+    part_files = [parts_dir / f"part-{i:05d}.parquet" for i in range(len(pieces))]
+    todo = [i for i, f in enumerate(part_files) if not f.exists()]
+    logger.info(f"batch inference: {len(pieces)} row group(s), {len(pieces) - len(todo)} already scored")
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(engine,)) as pool:
+            futures = {pool.submit(_score_piece, pieces[i], part_files[i]): i for i in todo}
+            for fut in as_completed(futures):
+                logger.info(f"row group {futures[fut]} scored: rows={fut.result()}")
+
+    n_rows = _merge_parts(part_files, out_file)
+    shutil.rmtree(parts_dir)
+    logger.info(f"Saved {n_rows} predictions ({len(pieces)} row groups) to: {out_file}")
+    return n_rows
@@ -0,0 +1,215 @@
+# coding: utf-8
+import argparse
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from constants import DATA
+
+MODEL_FILE = DATA / "models" / "baseline_logreg.joblib"
+# Lightweight artifact: manifest.json (vocabularies, offsets) + weights.npy.
+# Loading it needs neither sklearn nor joblib, and the weights are memory-mapped.
+COMPILED_DIR = DATA / "models" / "baseline_logreg_compiled"
+ARTIFACT_VERSION = 1
+
+# Max |p_compiled - p_sklearn| accepted by `check_parity`
+PARITY_ATOL = 1e-9
+
+
+def compile_pipeline(bundle: dict) -> dict:
+    """
+    Compile a fitted OneHotEncoder + StandardScaler + LogisticRegression bundle
+    into plain arrays.
+
+    - categorical column -> category vocabulary and a weight lookup table
+      (one coefficient per category, plus a trailing 0.0 for unknown/missing
+      values, like `handle_unknown="ignore"`)
+    - numeric columns -> coefficients divided by the scaler std, with the
+      scaler mean folded into the intercept
+
+    :param bundle: dict saved by train_baseline
+    :return: compiled artifact (numpy arrays, lists and scalars only)
+    """
+
+    model = bundle["model"]
+    pre = model.named_steps["preprocess"]
+    clf = model.named_steps["clf"]
+    cat_cols, num_cols = list(bundle["cat_cols"]), list(bundle["num_cols"])
+
+    coef = clf.coef_.ravel().astype("float64")
+    ohe = pre.named_transformers_["cat"]
+    scaler = pre.named_transformers_["num"]
+
+    categories, cat_weights = {}, {}
+    offset = 0
+    for col, cats in zip(cat_cols, ohe.categories_):
+        n = len(cats)
+        categories[col] = [str(c) for c in cats]
+        cat_weights[col] = np.append(coef[offset:offset + n], 0.0)
+        offset += n
+
+    num_coef = coef[offset:]
+    if len(num_coef) != len(num_cols):
+        raise ValueError(f"Coefficient length mismatch: {len(num_coef)} numeric coefficients vs {len(num_cols)} columns")
+
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(len(num_cols))
+    scale = scaler.scale_ if scaler.with_std else np.ones(len(num_cols))
+    num_weights = num_coef / scale
+    intercept = float(clf.intercept_[0] - np.dot(num_weights, mean))
+
+    return {
+        "id_col": bundle.get("id_col", "customer_id"),
+        "cat_cols": cat_cols,
+        "num_cols": num_cols,
+        "categories": categories,
+        "cat_weights": cat_weights,
+        "num_weights": num_weights,
+        "intercept": intercept,
+    }
+
+
+def save_compiled(compiled: dict, path=COMPILED_DIR) -> None:
+    """
+    Write a compiled scorer as a directory: every weight in one float64
+    `weights.npy`, everything else (columns, vocabularies, weight offsets,
+    intercept) in `manifest.json`. The directory is replaced atomically.
+
+    :param compiled: output of `compile_pipeline`
+    :param path: artifact directory
+    """
+
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    blocks = [compiled["num_weights"]] + [compiled["cat_weights"][c] for c in compiled["cat_cols"]]
+    bounds = np.cumsum([0] + [len(b) for b in blocks]).tolist()
+    np.save(tmp / "weights.npy", np.concatenate(blocks).astype("float64"))
+    manifest = {
+        "format_version": ARTIFACT_VERSION,
+        "id_col": compiled["id_col"],
+        "cat_cols": compiled["cat_cols"],
+        "num_cols": compiled["num_cols"],
+        "categories": compiled["categories"],
+        "intercept": compiled["intercept"],
+        "offsets": {
+            "num": bounds[0:2],
+            "cat": {c: bounds[i + 1:i + 3] for i, c in enumerate(compiled["cat_cols"])},
+        },
+    }
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    if path.exists():
+        shutil.rmtree(path)
+    tmp.rename(path)
+
+
+def load_compiled(path=COMPILED_DIR, mmap: bool = True) -> dict:
+    """
+    Load a compiled scorer saved by `save_compiled`.
+
+    :param path: artifact directory
+    :param mmap: memory-map the weights instead of reading them
+    :return: compiled artifact, as returned by `compile_pipeline`
+    """
+
+    path = Path(path)
+    manifest = json.loads((path / "manifest.json").read_text())
+    if manifest.get("format_version") != ARTIFACT_VERSION:
+        raise ValueError(f"{path}: unsupported artifact version {manifest.get('format_version')}")
+
+    weights = np.load(path / "weights.npy", mmap_mode="r" if mmap else None)
+    offsets = manifest["offsets"]
+    return {
+        "id_col": manifest["id_col"],
+        "cat_cols": manifest["cat_cols"],
+        "num_cols": manifest["num_cols"],
+        "categories": manifest["categories"],
+        "cat_weights": {c: weights[lo:hi] for c, (lo, hi) in offsets["cat"].items()},
+        "num_weights": weights[offsets["num"][0]:offsets["num"][1]],
+        "intercept": manifest["intercept"],
+    }
+
+
+def category_codes(s: pd.Series, categories: list[str]) -> np.ndarray:
+    """
+    Integer-code a column against a compiled vocabulary; unknown and missing
+    values map to len(categories), the zero-weight slot.
+
+    Categorical input is recoded through its (small) category list, so no
+    per-row string work is done.
+    """
+
+    vocab = pd.Index(categories)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        lut = vocab.get_indexer(s.cat.categories.astype(str))
+        lut = np.append(np.where(lut < 0, len(vocab), lut), len(vocab))  # code -1 (NaN) -> unknown
+        return lut[s.cat.codes.to_numpy()]
+
+    codes = vocab.get_indexer(s.astype("string").to_numpy(dtype=object, na_value=None))
+    return np.where(codes < 0, len(vocab), codes)
+
+
+def decision_function(compiled: dict, df: pd.DataFrame) -> np.ndarray:
+    """
+    Logit per row: one dense dot over the numeric block plus one table
+    lookup per categorical column.
+    """
+
+    x = df[compiled["num_cols"]].to_numpy(dtype="float64")
+    z = x @ compiled["num_weights"] + compiled["intercept"]
+    for col in compiled["cat_cols"]:
+        z += compiled["cat_weights"][col][category_codes(df[col], compiled["categories"][col])]
+    return z
+
+
+def predict_proba(compiled: dict, df: pd.DataFrame) -> np.ndarray:
+    """
+    P(churn) per row from a compiled artifact.
+
+    :param compiled: output of `compile_pipeline`
+    :param df: features (extra columns are ignored)
+    :return: float64 array
+    """
+
+    z = decision_function(compiled, df)
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def check_parity(bundle: dict, compiled: dict, df: pd.DataFrame, atol: float = PARITY_ATOL) -> float:
+    """
+    Compare the compiled scorer with the sklearn pipeline on `df`.
+
+    :return: max absolute probability difference
+    :raise ValueError: if it exceeds `atol`
+    """
+
+    expected = bundle["model"].predict_proba(df)[:, 1]
+    got = predict_proba(compiled, df)
+    diff = float(np.max(np.abs(expected - got))) if len(df) else 0.0
+    if diff > atol:
+        raise ValueError(f"Compiled scorer diverges from predict_proba: max |diff|={diff:.3e} > {atol:.0e}")
+    return diff
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compile a trained baseline bundle into the compact scorer format.")
+    parser.add_argument("--model", default=str(MODEL_FILE))
+    parser.add_argument("--out", default=str(COMPILED_DIR))
+    args = parser.parse_args(argv)
+
+    from joblib import load
+
+    compiled = compile_pipeline(load(args.model))
+    save_compiled(compiled, args.out)
+    logger.info(f"Saved compiled scorer to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,92 @@
 # coding: utf-8
+import argparse
+
 import pandas as pd
-from joblib import load
 from loguru import logger
 
 from constants import DATA
+from models import compiled_scorer
 
 INFERENCE_FILE = DATA / "datasets" / "inference.parquet"
 MODEL_FILE = DATA / "models" / "baseline_logreg.joblib"
 OUT_FILE = DATA / "predictions" / "inference_predictions.parquet"
 
+# "compiled": NumPy scorer exported by train_baseline
+# "sklearn": full Pipeline.predict_proba
+ENGINES = ("compiled", "sklearn")
+
 ID_COL = "customer_id"
 
 
-def main() -> None:
-    (DATA / "predictions").mkdir(parents=True, exist_ok=True)
+def score(bundle: dict, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Churn probability per customer with a trained model bundle or a
+    compiled scorer artifact.
 
-    bundle = load(MODEL_FILE)
-    model = bundle["model"]
-    id_col = bundle.get("id_col", ID_COL)
+    :param bundle: dict saved by train_baseline (model, id_col, ...),
+                   or a compiled artifact (see models.compiled_scorer)
+    :param df: inference features
+    :return: DataFrame[id_col, p_churn]
+    """
 
-    df = pd.read_parquet(INFERENCE_FILE)
+    id_col = bundle.get("id_col", ID_COL)
 
     if id_col not in df.columns:
         raise ValueError(f"Inference dataset missing `{id_col}`")
 
-    proba = model.predict_proba(df)[:, 1]
+    if "model" in bundle:
+        proba = bundle["model"].predict_proba(df)[:, 1]
+    else:
+        proba = compiled_scorer.predict_proba(bundle, df)
 
     out = pd.DataFrame({
         id_col: df[id_col].astype("string"),
         "p_churn": proba.astype("float64"),
     })
+    return out
+
+
+def load_scorer(engine: str = "compiled") -> dict:
+    """
+    Load the scorer for `engine`. The compiled artifact loads without
+    importing joblib / sklearn; they are only imported for the sklearn
+    engine, or to compile the bundle when the artifact is missing.
+    """
+
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine `{engine}`, expected one of {ENGINES}")
+    if engine == "compiled" and compiled_scorer.COMPILED_DIR.exists():
+        return compiled_scorer.load_compiled(compiled_scorer.COMPILED_DIR)
+
+    from joblib import load
+
+    bundle = load(MODEL_FILE)
+    if engine == "sklearn":
+        return bundle
+    logger.warning(f"{compiled_scorer.COMPILED_DIR} not found, compiling from {MODEL_FILE}")
+    return compiled_scorer.compile_pipeline(bundle)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Score the inference dataset.")
+    parser.add_argument("--engine", choices=ENGINES, default="compiled")
+    parser.add_argument("--batch", action="store_true",
+                        help="score row groups in a process pool (resumable, bounded memory)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-resume", action="store_true", help="with --batch: discard parts of a previous run")
+    args = parser.parse_args(argv)
+
+    (DATA / "predictions").mkdir(parents=True, exist_ok=True)
+
+    if args.batch:
+        from models.batch_predict import predict_batch
+
+        predict_batch(engine=args.engine, max_workers=args.workers, resume=not args.no_resume)
+        return
+
+    bundle = load_scorer(args.engine)
+    df = pd.read_parquet(INFERENCE_FILE)
+    out = score(bundle, df)
 
     out.to_parquet(OUT_FILE, index=False)
     logger.info(f"Saved inference predictions to: {OUT_FILE}")
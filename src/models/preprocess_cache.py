@@ -0,0 +1,176 @@
+# coding: utf-8
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pyarrow.parquet as pq
+import scipy.sparse as sp
+from joblib import dump, load
+from loguru import logger
+
+from constants import DATA
+from pipelines.dag import file_digest
+
+__all__ = [
+    "cache_key",
+    "prune_cache",
+    "load_design_matrices",
+    "save_design_matrices",
+]
+
+CACHE_DIR = DATA / "cache" / "preprocess"
+# Bump when the on-disk layout changes
+CACHE_VERSION = 1
+
+# Least recently used entries beyond this count are pruned after each store
+MAX_ENTRIES = 8
+# Dataset file digests memoised on (size, mtime), see pipelines.dag.file_digest
+DIGEST_MEMO = "_file_digests.json"
+
+MATRICES = ("X_train", "X_val")
+VECTORS = ("y_train", "y_val")
+
+
+def dataset_fingerprint(path, memo: dict) -> str:
+    """
+    Digest of a parquet file or of every file of a dataset directory. File
+    contents are hashed once per (size, mtime), so an unchanged multi-GB
+    train set costs a stat per run.
+    """
+
+    h = hashlib.sha256()
+    for f in sorted(pq.ParquetDataset(path).files):
+        h.update(f"{Path(f).name}:{file_digest(Path(f), memo)}\n".encode())
+    return h.hexdigest()
+
+
+def cache_key(paths, config: dict, cache_dir=CACHE_DIR) -> str:
+    """
+    Cache key of an encoded dataset: input contents + transformer configuration
+    (include anything that changes the encoding, e.g. the sklearn version).
+
+    :param paths: input parquet files / dataset directories
+    :param config: JSON-serializable transformer configuration
+    :param cache_dir: cache root (holds the file digest memo)
+    :return:
+    """
+
+    memo_file = Path(cache_dir) / DIGEST_MEMO
+    memo = json.loads(memo_file.read_text()) if memo_file.exists() else {}
+    payload = {
+        "version": CACHE_VERSION,
+        "inputs": [dataset_fingerprint(p, memo) for p in paths],
+        "config": config,
+    }
+    memo_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = memo_file.with_name(f".{memo_file.name}.tmp")
+    tmp.write_text(json.dumps(memo, indent=2, sort_keys=True))
+    tmp.replace(memo_file)
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:24]
+
+
+def _save_matrix(X, out_dir: Path, name: str) -> dict:
+    if sp.issparse(X):
+        X = sp.csr_matrix(X)
+        for part in ("data", "indices", "indptr"):
+            np.save(out_dir / f"{name}.{part}.npy", getattr(X, part))
+        return {"format": "csr", "shape": list(X.shape)}
+    np.save(out_dir / f"{name}.npy", np.asarray(X))
+    return {"format": "dense", "shape": list(X.shape)}
+
+
+def _load_matrix(in_dir: Path, name: str, info: dict):
+    if info["format"] == "csr":
+        data, indices, indptr = (np.load(in_dir / f"{name}.{p}.npy", mmap_mode="r") for p in ("data", "indices", "indptr"))
+        return sp.csr_matrix((data, indices, indptr), shape=tuple(info["shape"]), copy=False)
+    return np.load(in_dir / f"{name}.npy", mmap_mode="r")
+
+
+def save_design_matrices(key: str, entry: dict, cache_dir=CACHE_DIR) -> Path:
+    """
+    Store encoded train / validation matrices (CSR parts or dense arrays as
+    .npy), labels, column lists and the fitted transformer under `key`.
+    The entry directory is written atomically.
+
+    :param key: see `cache_key`
+    :param entry: {"preprocess", "X_train", "X_val", "y_train", "y_val", "cat_cols", "num_cols"}
+    :param cache_dir: cache root
+    :return: entry directory
+    """
+
+    out_dir = Path(cache_dir) / key
+    tmp = out_dir.with_name(f".{key}.tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    meta = {"cat_cols": entry["cat_cols"], "num_cols": entry["num_cols"], "matrices": {}}
+    for name in MATRICES:
+        meta["matrices"][name] = _save_matrix(entry[name], tmp, name)
+    for name in VECTORS:
+        np.save(tmp / f"{name}.npy", np.asarray(entry[name]))
+    dump(entry["preprocess"], tmp / "preprocess.joblib")
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2))
+
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    tmp.rename(out_dir)
+    logger.info(f"preprocess cache: stored {key}")
+    prune_cache(cache_dir)
+    return out_dir
+
+
+def prune_cache(cache_dir=CACHE_DIR, max_entries: int = MAX_ENTRIES) -> list[str]:
+    """
+    Drop the least recently used entries (by `meta.json` mtime, refreshed on
+    every hit) beyond `max_entries`.
+
+    :param cache_dir: cache root
+    :param max_entries: entries to keep
+    :return: pruned keys
+    """
+
+    entries = sorted(
+        (p for p in Path(cache_dir).iterdir() if (p / "meta.json").exists()),
+        key=lambda p: (p / "meta.json").stat().st_mtime_ns,
+        reverse=True,
+    )
+    pruned = []
+    for p in entries[max_entries:]:
+        shutil.rmtree(p, ignore_errors=True)
+        pruned.append(p.name)
+    if pruned:
+        logger.info(f"preprocess cache: pruned least recently used {pruned}")
+    return pruned
+
+
+def load_design_matrices(key: str, cache_dir=CACHE_DIR) -> dict | None:
+    """
+    Memory-map a cached entry, or return None on a miss.
+
+    :param key: see `cache_key`
+    :param cache_dir: cache root
+    :return: same keys as `save_design_matrices` expects
+    """
+
+    in_dir = Path(cache_dir) / key
+    if not (in_dir / "meta.json").exists():
+        logger.info(f"preprocess cache: miss {key}")
+        return None
+
+    meta = json.loads((in_dir / "meta.json").read_text())
+    os.utime(in_dir / "meta.json")
+    entry = {
+        "cat_cols": meta["cat_cols"],
+        "num_cols": meta["num_cols"],
+        "preprocess": load(in_dir / "preprocess.joblib"),
+    }
+    for name in MATRICES:
+        entry[name] = _load_matrix(in_dir, name, meta["matrices"][name])
+    for name in VECTORS:
+        entry[name] = np.load(in_dir / f"{name}.npy", mmap_mode="r")
+    logger.info(f"preprocess cache: hit {key}")
+    return entry
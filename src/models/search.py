@@ -0,0 +1,209 @@
+# coding: utf-8
+import argparse
+import itertools
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from loguru import logger
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import average_precision_score, roc_auc_score
+
+from constants import DATA
+from decision.top_k import BENEFIT, COST
+from log_utils import log_dataframe
+from models.preprocess_cache import load_design_matrices
+from models.train_baseline import VAL_FILE, design_matrices, preprocess_cache_key
+
+__all__ = [
+    "SEARCH_SPACE",
+    "run_search",
+    "top_k_net_gain",
+]
+
+OUT_FILE = DATA / "models" / "search_results.parquet"
+
+TOP_K = 200
+
+# Successive halving: each rung keeps 1/ETA of the configurations and
+# trains on ETA times more rows, the last rung on the full training set.
+ETA = 3
+MIN_ROWS = 500
+SEED = 42
+
+SEARCH_SPACE = {
+    "logreg": {
+        "C": [0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0],
+        "penalty": ["l2", "l1"],
+        "class_weight": [None, "balanced"],
+    },
+    "hist_gb": {
+        "learning_rate": [0.03, 0.1],
+        "max_leaf_nodes": [15, 31],
+        "l2_regularization": [0.0, 1.0],
+        "class_weight": [None, "balanced"],
+    },
+}
+
+
+def expand_grid(space=SEARCH_SPACE) -> list[tuple[str, dict]]:
+    return [
+        (family, dict(zip(grid, values)))
+        for family, grid in space.items()
+        for values in itertools.product(*grid.values())
+    ]
+
+
+def make_estimator(family: str, params: dict):
+    if family == "logreg":
+        params = dict(params)
+        penalty = params.pop("penalty")
+        if penalty == "l2":
+            return LogisticRegression(max_iter=2000, solver="lbfgs", **params)
+        if penalty == "l1":
+            # lbfgs (the baseline solver) has no L1; saga handles it on the scaled matrix
+            return LogisticRegression(max_iter=2000, solver="saga", l1_ratio=1.0, **params)
+        raise ValueError(f"Unknown penalty `{penalty}`, expected l1 or l2")
+    if family == "hist_gb":
+        return HistGradientBoostingClassifier(max_iter=300, early_stopping=True, random_state=SEED, **params)
+    raise ValueError(f"Unknown model family `{family}`, expected one of {list(SEARCH_SPACE)}")
+
+
+def top_k_net_gain(y: np.ndarray, proba: np.ndarray, k: int = TOP_K, cost: float = COST,
+                   benefit: float = BENEFIT) -> float:
+    """
+    Net gain of contacting the k highest-scored customers:
+    benefit * churners reached - cost * k (as `simulate_top_k` in the notebook).
+    """
+
+    k = min(k, len(proba))
+    top = np.argpartition(-proba, k - 1)[:k]
+    return float(benefit * y[top].sum() - cost * k)
+
+
+# Matrices of the worker process, memory-mapped from the preprocess cache
+_MATRICES = None
+
+
+def _init_worker(key: str) -> None:
+    global _MATRICES
+    _MATRICES = load_design_matrices(key)
+    if _MATRICES is None:
+        raise ValueError(f"Preprocess cache entry {key} not found")
+
+
+def _dense(name: str) -> np.ndarray:
+    # Tree models need dense input; densified once per worker on first use
+    dense_name = f"{name}_dense"
+    if dense_name not in _MATRICES:
+        X = _MATRICES[name]
+        _MATRICES[dense_name] = X.toarray() if sp.issparse(X) else np.asarray(X)
+    return _MATRICES[dense_name]
+
+
+def _evaluate(family: str, params: dict, rows: np.ndarray | None, k: int) -> dict:
+    dense = family == "hist_gb"
+    X_train = _dense("X_train") if dense else _MATRICES["X_train"]
+    X_val = _dense("X_val") if dense else _MATRICES["X_val"]
+    y_train, y_val = np.asarray(_MATRICES["y_train"]), np.asarray(_MATRICES["y_val"])
+    if rows is not None:
+        X_train, y_train = X_train[rows], y_train[rows]
+
+    start = time.perf_counter()
+    model = make_estimator(family, params).fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    proba = model.predict_proba(X_val)[:, 1]
+    return {
+        "pr_auc": float(average_precision_score(y_val, proba)),
+        "roc_auc": float(roc_auc_score(y_val, proba)),
+        "net_gain_top_k": top_k_net_gain(y_val, proba, k),
+        "fit_seconds": fit_seconds,
+    }
+
+
+def _rank(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(["pr_auc", "net_gain_top_k"], ascending=False, kind="stable").reset_index(drop=True)
+
+
+def run_search(
+        space=SEARCH_SPACE,
+        k: int = TOP_K,
+        eta: int = ETA,
+        min_rows: int = MIN_ROWS,
+        max_workers: int | None = None,
+) -> pd.DataFrame:
+    """
+    Successive-halving search over model families and hyperparameters.
+
+    Every configuration starts on a small random subset of the training rows;
+    after each rung only the best 1/eta (by validation PR-AUC, then top-K net
+    gain) continue on eta times more rows, up to the full training set.
+    Fits run in a process pool whose workers memory-map the encoded matrices
+    from the preprocess cache, so the design matrix is never copied per task.
+
+    :param space: {family: {param: [values]}}
+    :param k: customers contacted for the top-K net gain metric
+    :param eta: halving rate
+    :param min_rows: training rows of the first rung
+    :param max_workers: process pool size, defaults to the number of CPUs
+    :return: one row per (configuration, rung), best full-data result first
+    """
+
+    validation_df = pd.read_parquet(VAL_FILE)
+    design_matrices(validation_df, use_cache=True)
+    key = preprocess_cache_key()
+    n_train = len(load_design_matrices(key)["y_train"])
+
+    configs = expand_grid(space)
+    n_rungs = max(1, math.ceil(math.log(len(configs), eta)))
+    perm = np.random.default_rng(SEED).permutation(n_train)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(key,)) as pool:
+        for rung in range(n_rungs + 1):
+            last = rung == n_rungs or len(configs) == 1
+            n_rows = n_train if last else min(n_train, min_rows * eta ** rung)
+            rows = None if n_rows == n_train else np.sort(perm[:n_rows])
+            logger.info(f"rung {rung}: {len(configs)} configuration(s) on {n_rows} training rows")
+
+            futures = [pool.submit(_evaluate, family, params, rows, k) for family, params in configs]
+            rung_df = _rank(pd.DataFrame([
+                {"family": family, "params": str(params), "rung": rung, "train_rows": n_rows, **fut.result()}
+                for (family, params), fut in zip(configs, futures)
+            ]))
+            results.append(rung_df)
+            if last:
+                break
+
+            keep = max(1, len(configs) // eta)
+            by_label = {(f, str(p)): (f, p) for f, p in configs}
+            configs = [by_label[(f, p)] for f, p in rung_df[["family", "params"]].head(keep).itertuples(index=False)]
+
+    final = results[-1]
+    earlier = pd.concat(results[:-1], ignore_index=True) if len(results) > 1 else final.iloc[:0]
+    return pd.concat([final, earlier.sort_values("rung", ascending=False, kind="stable")], ignore_index=True)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Model-family / hyperparameter search with successive halving.")
+    parser.add_argument("--k", type=int, default=TOP_K, help="customers contacted for the net gain metric")
+    parser.add_argument("--eta", type=int, default=ETA)
+    parser.add_argument("--min-rows", type=int, default=MIN_ROWS)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_search(k=args.k, eta=args.eta, min_rows=args.min_rows, max_workers=args.workers)
+    logger.info(f"search finished in {time.perf_counter() - start:.1f}s, {len(results)} fits")
+
+    log_dataframe(results, "Search results (best first)", max_rows=10)
+    results.to_parquet(OUT_FILE, index=False)
+    logger.info(f"Saved search results to: {OUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
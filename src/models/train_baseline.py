@@ -1,6 +1,11 @@
 # coding: utf-8
+import argparse
+import hashlib
+import inspect
+
 import numpy as np
 import pandas as pd
+import sklearn
 from joblib import dump
 from loguru import logger
 from sklearn.compose import ColumnTransformer
@@ -15,6 +20,8 @@ from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
 from constants import DATA
+from models.compiled_scorer import COMPILED_DIR, check_parity, compile_pipeline, save_compiled
+from models.preprocess_cache import cache_key, load_design_matrices, save_design_matrices
 
 TRAIN_FILE = DATA / "datasets" / "train.parquet"
 VAL_FILE = DATA / "datasets" / "validation.parquet"
@@ -24,6 +31,14 @@ VAL_PRED_FILE = DATA / "predictions" / "validation_predictions.parquet"
 ID_COL = "customer_id"
 TARGET_COL = "churn"
 
+# Encoding of the design matrix; part of the preprocess cache key
+PREPROCESS_CONFIG = {
+    "cat": {"encoder": "onehot", "handle_unknown": "ignore"},
+    "num": {"scaler": "standard"},
+    "sparse_threshold": 1.0,
+    "sklearn": sklearn.__version__,
+}
+
 
 def _infer_feature_columns(df: pd.DataFrame) -> tuple[list[str], list[str]]:
     """
@@ -72,78 +87,175 @@ def _print_top_coefficients(model: Pipeline, cat_cols: list[str], num_cols: list
         logger.info(f"  {feature_names[i]}: {coef[i]:.4f}")
 
 
-def main() -> None:
-    train_df = pd.read_parquet(TRAIN_FILE)
-    validation_df = pd.read_parquet(VAL_FILE)
+def log_validation_report(y_val, val_proba: np.ndarray) -> np.ndarray:
+    """
+    Log ROC-AUC, PR-AUC, confusion matrix and classification report.
+
+    :return: predicted labels @ threshold=0.5
+    """
+
+    val_pred = (val_proba >= 0.5).astype(int)
+
+    roc = roc_auc_score(y_val, val_proba)
+    ap = average_precision_score(y_val, val_proba)
+    cm = confusion_matrix(y_val, val_pred)
+
+    logger.info("Validation Metrics")
+    logger.info(f"  ROC-AUC: {roc:.4f}")
+    logger.info(f"  PR-AUC (Average Precision): {ap:.4f}")
+    logger.info("Confusion Matrix @ threshold=0.5")
+    logger.info(cm)
+    logger.info("Classification Report @ threshold=0.5")
+    logger.info(classification_report(y_val, val_pred, digits=4))
+    return val_pred
+
 
+def _check_columns(df: pd.DataFrame, name: str) -> None:
     # Basic sanity
-    for name, df in [("train", train_df), ("validation", validation_df)]:
-        if TARGET_COL not in df.columns:
-            raise ValueError(f"{name}: missing target column `{TARGET_COL}`")
-        if ID_COL not in df.columns:
-            raise ValueError(f"{name}: missing id column `{ID_COL}`")
+    if TARGET_COL not in df.columns:
+        raise ValueError(f"{name}: missing target column `{TARGET_COL}`")
+    if ID_COL not in df.columns:
+        raise ValueError(f"{name}: missing id column `{ID_COL}`")
 
-    X_train = train_df.drop(columns=[TARGET_COL])
-    y_train = train_df[TARGET_COL].astype("int8")
 
-    X_val = validation_df.drop(columns=[TARGET_COL])
-    y_val = validation_df[TARGET_COL].astype("int8")
+def _onehot_encoder(config: dict) -> OneHotEncoder:
+    return OneHotEncoder(handle_unknown=config["handle_unknown"])
 
-    cat_cols, num_cols = _infer_feature_columns(train_df)
 
-    preprocess = ColumnTransformer(
+def _standard_scaler(config: dict) -> StandardScaler:
+    return StandardScaler()
+
+
+# --- Transformer registries ---
+# PREPROCESS_CONFIG names the encoder / scaler; register new ones here.
+ENCODERS = {
+    "onehot": _onehot_encoder,
+}
+SCALERS = {
+    "standard": _standard_scaler,
+}
+
+
+def build_preprocess(cat_cols: list[str], num_cols: list[str], config: dict = PREPROCESS_CONFIG) -> ColumnTransformer:
+    encoder, scaler = config["cat"]["encoder"], config["num"]["scaler"]
+    if encoder not in ENCODERS:
+        raise ValueError(f"Unknown encoder `{encoder}`, expected one of {list(ENCODERS)}")
+    if scaler not in SCALERS:
+        raise ValueError(f"Unknown scaler `{scaler}`, expected one of {list(SCALERS)}")
+
+    return ColumnTransformer(
         transformers=[
-            ("cat", OneHotEncoder(handle_unknown="ignore"), cat_cols),
-            ("num", StandardScaler(), num_cols),
+            ("cat", ENCODERS[encoder](config["cat"]), cat_cols),
+            ("num", SCALERS[scaler](config["num"]), num_cols),
         ],
         remainder="drop",
-        sparse_threshold=1.0,
+        sparse_threshold=config["sparse_threshold"],
     )
 
+
+def preprocess_cache_key(config: dict = PREPROCESS_CONFIG) -> str:
+    """
+    Preprocess cache key of the current train / validation sets: dataset
+    fingerprints, `config`, and a digest of the source of the column-type
+    split and of the transformers, so editing that code invalidates entries.
+    """
+
+    code = hashlib.sha256()
+    for fn in (_infer_feature_columns, build_preprocess, *ENCODERS.values(), *SCALERS.values()):
+        code.update(inspect.getsource(fn).encode())
+    return cache_key([TRAIN_FILE, VAL_FILE], {**config, "code": code.hexdigest()})
+
+
+def design_matrices(validation_df: pd.DataFrame, use_cache: bool = True) -> dict:
+    """
+    Encoded train / validation matrices with the fitted ColumnTransformer.
+
+    Cached on disk by `preprocess_cache_key`: a hit
+    memory-maps the matrices and skips reading the train set, inferring
+    column types and fitting the encoders.
+
+    :param validation_df: validation set (already read by the caller)
+    :param use_cache: read / write the preprocess cache
+    :return: {"preprocess", "X_train", "X_val", "y_train", "y_val", "cat_cols", "num_cols"}
+    """
+
+    key = preprocess_cache_key() if use_cache else None
+    if use_cache:
+        entry = load_design_matrices(key)
+        if entry is not None:
+            return entry
+
+    train_df = pd.read_parquet(TRAIN_FILE)
+    _check_columns(train_df, "train")
+
+    cat_cols, num_cols = _infer_feature_columns(train_df)
+    preprocess = build_preprocess(cat_cols, num_cols)
+    entry = {
+        "preprocess": preprocess,
+        "X_train": preprocess.fit_transform(train_df.drop(columns=[TARGET_COL])),
+        "X_val": preprocess.transform(validation_df.drop(columns=[TARGET_COL])),
+        "y_train": train_df[TARGET_COL].astype("int8").to_numpy(),
+        "y_val": validation_df[TARGET_COL].astype("int8").to_numpy(),
+        "cat_cols": cat_cols,
+        "num_cols": num_cols,
+    }
+    if use_cache:
+        save_design_matrices(key, entry)
+    return entry
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Train the baseline logistic regression.")
+    parser.add_argument("--C", type=float, default=1.0, help="inverse regularization strength")
+    parser.add_argument("--class-weight", choices=["balanced", "none"], default="balanced")
+    parser.add_argument("--no-cache", action="store_true", help="re-encode instead of using the preprocess cache")
+    args = parser.parse_args(argv)
+
+    validation_df = pd.read_parquet(VAL_FILE)
+    _check_columns(validation_df, "validation")
+    X_val = validation_df.drop(columns=[TARGET_COL])
+    y_val = validation_df[TARGET_COL].astype("int8")
+
+    matrices = design_matrices(validation_df, use_cache=not args.no_cache)
+    cat_cols, num_cols = matrices["cat_cols"], matrices["num_cols"]
+
     clf = LogisticRegression(
+        C=args.C,
         max_iter=2000,
-        class_weight="balanced",
+        class_weight=None if args.class_weight == "none" else args.class_weight,
         solver="lbfgs",
     )
+    clf.fit(matrices["X_train"], matrices["y_train"])
 
+    # The transformer is already fitted; the pipeline is only assembled for scoring / saving
     model = Pipeline(steps=[
-        ("preprocess", preprocess),
+        ("preprocess", matrices["preprocess"]),
         ("clf", clf),
     ])
 
-    model.fit(X_train, y_train)
-
     # --- Validation metrics ---
-    val_proba = model.predict_proba(X_val)[:, 1]
-    val_pred = (val_proba >= 0.5).astype(int)
-
-    roc = roc_auc_score(y_val, val_proba)
-    ap = average_precision_score(y_val, val_proba)
-    cm = confusion_matrix(y_val, val_pred)
-
-    logger.info("Validation Metrics")
-    logger.info(f"  ROC-AUC: {roc:.4f}")
-    logger.info(f"  PR-AUC (Average Precision): {ap:.4f}")
-    logger.info("Confusion Matrix @ threshold=0.5")
-    logger.info(cm)
-    logger.info("Classification Report @ threshold=0.5")
-    logger.info(classification_report(y_val, val_pred, digits=4))
+    val_proba = clf.predict_proba(matrices["X_val"])[:, 1]
+    val_pred = log_validation_report(y_val, val_proba)
 
     _print_top_coefficients(model, cat_cols, num_cols, top_k=15)
 
     # --- Save model ---
-    dump(
-        {
-            "model": model,
-            "cat_cols": cat_cols,
-            "num_cols": num_cols,
-            "id_col": ID_COL,
-            "target_col": TARGET_COL,
-        },
-        MODEL_FILE,
-    )
+    bundle = {
+        "model": model,
+        "cat_cols": cat_cols,
+        "num_cols": num_cols,
+        "id_col": ID_COL,
+        "target_col": TARGET_COL,
+    }
+    dump(bundle, MODEL_FILE)
     logger.info(f"\nSaved model to: {MODEL_FILE}")
 
+    # --- Export compiled scorer (verified against predict_proba on validation) ---
+    compiled = compile_pipeline(bundle)
+    diff = check_parity(bundle, compiled, X_val)
+    save_compiled(compiled, COMPILED_DIR)
+    logger.info(f"Saved compiled scorer to: {COMPILED_DIR} (max |diff| vs predict_proba: {diff:.1e})")
+
     # --- Save validation predictions (for analysis / thresholding) ---
     out_val = validation_df[[ID_COL, TARGET_COL]].copy()
     out_val["p_churn"] = val_proba.astype("float64")
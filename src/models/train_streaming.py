@@ -0,0 +1,222 @@
+# coding: utf-8
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+from sklearn.linear_model import SGDClassifier
+
+from constants import DATA
+from features.feature_views import TENURE_BUCKET_LABELS
+from models.compiled_scorer import category_codes, predict_proba, save_compiled
+from models.train_baseline import ID_COL, TARGET_COL, TRAIN_FILE, VAL_FILE, log_validation_report
+from staging.domains import domain_categories
+
+__all__ = [
+    "train_streaming",
+]
+
+OUT_DIR = DATA / "models" / "sgd_logreg_compiled"
+
+# Rows per record batch read from parquet; bounds peak memory
+BATCH_ROWS = 65_536
+EPOCHS = 5
+SEED = 42
+
+# Encoder vocabularies are fixed up front instead of learned from the data
+FEATURE_VOCABULARIES = {
+    "contract_type": domain_categories("contract"),
+    "tenure_bucket": TENURE_BUCKET_LABELS,
+}
+
+
+def feature_columns(schema: pa.Schema) -> tuple[list[str], list[str]]:
+    """
+    Categorical / numeric feature columns from the parquet schema alone
+    (same split as `_infer_feature_columns`, without reading any rows).
+    """
+
+    cat_cols, num_cols = [], []
+    for f in schema:
+        if f.name in (ID_COL, TARGET_COL):
+            continue
+        if pa.types.is_dictionary(f.type) or pa.types.is_string(f.type) or pa.types.is_large_string(f.type):
+            if f.name not in FEATURE_VOCABULARIES:
+                raise ValueError(f"No fixed vocabulary for categorical feature `{f.name}`")
+            cat_cols.append(f.name)
+        elif pa.types.is_integer(f.type) or pa.types.is_floating(f.type) or pa.types.is_boolean(f.type):
+            num_cols.append(f.name)
+    if not cat_cols and not num_cols:
+        raise ValueError("No feature columns found.")
+    return cat_cols, num_cols
+
+
+def iter_frames(path, columns, batch_rows: int = BATCH_ROWS):
+    """
+    Stream a parquet file or dataset directory as DataFrames of at most
+    `batch_rows` rows.
+    """
+
+    for f in sorted(pq.ParquetDataset(path).files):
+        for batch in pq.ParquetFile(f).iter_batches(batch_size=batch_rows, columns=columns):
+            yield batch.to_pandas()
+
+
+class RunningMoments:
+    """
+    Column mean / population variance merged batch by batch (Chan et al.),
+    numerically equivalent to a single Welford pass.
+    """
+
+    def __init__(self, n_cols: int):
+        self.n = 0
+        self.mean = np.zeros(n_cols)
+        self.m2 = np.zeros(n_cols)
+
+    def update(self, x: np.ndarray) -> None:
+        n_b = len(x)
+        if not n_b:
+            return
+        mean_b = x.mean(axis=0)
+        m2_b = ((x - mean_b) ** 2).sum(axis=0)
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * n_b / n
+        self.m2 = self.m2 + m2_b + delta ** 2 * self.n * n_b / n
+        self.n = n
+
+    @property
+    def std(self) -> np.ndarray:
+        std = np.sqrt(self.m2 / max(self.n, 1))
+        # Constant columns are left unscaled, like StandardScaler
+        return np.where(std == 0, 1.0, std)
+
+
+def _encode(df: pd.DataFrame, cat_cols, num_cols, mean, std) -> np.ndarray:
+    blocks = []
+    for col in cat_cols:
+        vocab = FEATURE_VOCABULARIES[col]
+        # Unknown values get the extra last slot, which is dropped: all-zero one-hot
+        blocks.append(np.eye(len(vocab) + 1)[category_codes(df[col], vocab)][:, :-1])
+    blocks.append((df[num_cols].to_numpy(dtype="float64") - mean) / std)
+    return np.hstack(blocks)
+
+
+def train_streaming(
+        train_path=TRAIN_FILE,
+        epochs: int = EPOCHS,
+        C: float = 1.0,
+        class_weight: str | None = "balanced",
+        batch_rows: int = BATCH_ROWS,
+) -> dict:
+    """
+    Out-of-core logistic regression: SGD (`log_loss`) fitted with
+    `partial_fit` over parquet record batches.
+
+    Pass 1 streams the numeric columns for the scaler mean/std and the class
+    counts; passes 2..epochs+1 stream encoded batches into `partial_fit`.
+    Category vocabularies are fixed (DOMAIN_VALUES, tenure bucket labels), so
+    no pass is needed to learn them. The L2 strength matches
+    `LogisticRegression(C)` on the same data: alpha = 1 / (C * n_rows).
+
+    :param train_path: train parquet file or dataset directory
+    :param epochs: passes over the training data
+    :param C: inverse regularization strength, as in train_baseline
+    :param class_weight: "balanced" or None
+    :param batch_rows: rows per batch
+    :return: compiled scorer artifact (see models.compiled_scorer)
+    """
+
+    cat_cols, num_cols = feature_columns(pq.ParquetDataset(train_path).schema)
+    columns = cat_cols + num_cols + [TARGET_COL]
+
+    # --- Pass 1: scaler statistics and class counts ---
+    moments = RunningMoments(len(num_cols))
+    class_counts = np.zeros(2, dtype="int64")
+    for df in iter_frames(train_path, num_cols + [TARGET_COL], batch_rows):
+        moments.update(df[num_cols].to_numpy(dtype="float64"))
+        class_counts += np.bincount(df[TARGET_COL].to_numpy(dtype="int64"), minlength=2)[:2]
+    n_rows = int(class_counts.sum())
+    if n_rows == 0 or class_counts.min() == 0:
+        raise ValueError(f"Training data needs both classes, got counts {class_counts.tolist()}")
+    mean, std = moments.mean, moments.std
+
+    weights = n_rows / (2 * class_counts) if class_weight == "balanced" else np.ones(2)
+    logger.info(f"pass 1: rows={n_rows}, class_counts={class_counts.tolist()}")
+
+    # --- Passes 2..: SGD ---
+    clf = SGDClassifier(loss="log_loss", alpha=1.0 / (C * n_rows), average=True, random_state=SEED)
+    rng = np.random.default_rng(SEED)
+    for epoch in range(epochs):
+        for df in iter_frames(train_path, columns, batch_rows):
+            order = rng.permutation(len(df))
+            X = _encode(df, cat_cols, num_cols, mean, std)[order]
+            y = df[TARGET_COL].to_numpy(dtype="int64")[order]
+            clf.partial_fit(X, y, classes=np.array([0, 1]), sample_weight=weights[y])
+        logger.info(f"epoch {epoch + 1}/{epochs} done")
+
+    # --- Fold the scaler into the weights (compiled scorer format) ---
+    coef = clf.coef_.ravel()
+    categories, cat_weights = {}, {}
+    offset = 0
+    for col in cat_cols:
+        vocab = FEATURE_VOCABULARIES[col]
+        categories[col] = list(vocab)
+        cat_weights[col] = np.append(coef[offset:offset + len(vocab)], 0.0)
+        offset += len(vocab)
+    num_weights = coef[offset:] / std
+
+    return {
+        "id_col": ID_COL,
+        "cat_cols": cat_cols,
+        "num_cols": num_cols,
+        "categories": categories,
+        "cat_weights": cat_weights,
+        "num_weights": num_weights,
+        "intercept": float(clf.intercept_[0] - np.dot(num_weights, mean)),
+    }
+
+
+def evaluate_streaming(compiled: dict, val_path=VAL_FILE, batch_rows: int = BATCH_ROWS) -> np.ndarray:
+    """
+    Score the validation set batch by batch and log the train_baseline report.
+    Only the labels and probabilities (two floats per row) are kept.
+
+    :return: validation probabilities
+    """
+
+    columns = compiled["cat_cols"] + compiled["num_cols"] + [TARGET_COL]
+    probas, labels = [], []
+    for df in iter_frames(val_path, columns, batch_rows):
+        probas.append(predict_proba(compiled, df))
+        labels.append(df[TARGET_COL].to_numpy(dtype="int8"))
+    val_proba = np.concatenate(probas)
+    log_validation_report(np.concatenate(labels), val_proba)
+    return val_proba
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Out-of-core SGD logistic regression over parquet batches.")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--C", type=float, default=1.0)
+    parser.add_argument("--class-weight", choices=["balanced", "none"], default="balanced")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    parser.add_argument("--out", default=str(OUT_DIR))
+    args = parser.parse_args(argv)
+
+    compiled = train_streaming(
+        TRAIN_FILE,
+        epochs=args.epochs,
+        C=args.C,
+        class_weight=None if args.class_weight == "none" else args.class_weight,
+        batch_rows=args.batch_rows,
+    )
+    evaluate_streaming(compiled, VAL_FILE, args.batch_rows)
+    save_compiled(compiled, args.out)
+    logger.info(f"Saved compiled SGD scorer to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
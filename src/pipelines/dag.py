@@ -0,0 +1,261 @@
+# coding: utf-8
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from loguru import logger
+
+from constants import DATA, PROJECT_ROOT
+from pipelines.stages import COMMON_CODE, STAGES
+
+__all__ = [
+    "run_pipeline",
+    "stage_fingerprint",
+]
+
+SRC_DIR = PROJECT_ROOT / "src"
+CACHE_FILE = DATA / ".pipeline_cache.json"
+
+_CHUNK = 1 << 20
+
+
+def dependencies(stages=STAGES) -> dict[str, set[str]]:
+    """
+    Upstream stages of every stage, derived from declared inputs/outputs.
+    """
+
+    producer = {}
+    for name, spec in stages.items():
+        for out in spec["outputs"]:
+            if out in producer:
+                raise ValueError(f"`{out}` is produced by both `{producer[out]}` and `{name}`")
+            producer[out] = name
+    return {
+        name: {producer[f] for f in spec["inputs"] if f in producer}
+        for name, spec in stages.items()
+    }
+
+
+def select_stages(targets=None, stages=STAGES) -> list[str]:
+    """
+    Targets plus everything upstream of them, in registry order.
+    """
+
+    if not targets:
+        return list(stages)
+    unknown = set(targets) - set(stages)
+    if unknown:
+        raise ValueError(f"Unknown stage(s) {sorted(unknown)}, expected some of {list(stages)}")
+
+    deps = dependencies(stages)
+    needed, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo.extend(deps[name])
+    return [name for name in stages if name in needed]
+
+
+def file_digest(path: Path, memo: dict) -> str:
+    """
+    sha256 of a file's content, memoised on (size, mtime) so unchanged
+    multi-GB inputs are hashed once. A directory (e.g. a partitioned dataset
+    or a model artifact) hashes the names and digests of its files.
+    """
+
+    if path.is_dir():
+        h = hashlib.sha256()
+        for f in sorted(p for p in path.rglob("*") if p.is_file()):
+            h.update(f"{f.relative_to(path)}:{file_digest(f, memo)}\n".encode())
+        return h.hexdigest()
+
+    st = path.stat()
+    key = str(path)
+    cached = memo.get(key)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK):
+            h.update(chunk)
+    memo[key] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+    return memo[key][2]
+
+
+def _code_files(entries) -> list[Path]:
+    files = []
+    for entry in entries:
+        path = SRC_DIR / entry
+        files.extend(sorted(path.rglob("*.py")) if path.is_dir() else [path])
+    return files
+
+
+def stage_fingerprint(name: str, memo: dict, stages=STAGES) -> str:
+    """
+    Content address of one stage run: input file contents, stage source code
+    and parameters. Equal fingerprints mean the outputs would be identical.
+
+    :param name: stage name
+    :param memo: file digest memo (see `file_digest`)
+    :param stages: stage registry
+    :return: hex digest
+    """
+
+    spec = stages[name]
+    missing = [str(f) for f in spec["inputs"] if not f.exists()]
+    if missing:
+        raise ValueError(f"Stage `{name}` is missing input(s): {missing}")
+
+    payload = {
+        "module": spec["module"],
+        "args": spec["args"],
+        "inputs": {str(f.relative_to(DATA)): file_digest(f, memo) for f in spec["inputs"]},
+        "code": {
+            str(f.relative_to(SRC_DIR)): file_digest(f, memo)
+            for f in _code_files(COMMON_CODE + spec["code"])
+        },
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _load_cache(cache_file: Path) -> dict:
+    if cache_file.exists():
+        return json.loads(cache_file.read_text())
+    return {"stages": {}, "files": {}}
+
+
+def _save_cache(cache: dict, cache_file: Path) -> None:
+    tmp = cache_file.with_name(f".{cache_file.name}.tmp")
+    tmp.write_text(json.dumps(cache, indent=2, sort_keys=True))
+    tmp.replace(cache_file)
+
+
+def run_stage(name: str, stages=STAGES) -> float:
+    """
+    Run one stage's `main()` in a fresh interpreter, from src/.
+
+    :return: elapsed seconds
+    """
+
+    spec = stages[name]
+    for out in spec["outputs"]:
+        out.parent.mkdir(parents=True, exist_ok=True)
+
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-m", spec["module"], *spec["args"]], cwd=SRC_DIR, env=env)
+    if proc.returncode != 0:
+        raise ValueError(f"Stage `{name}` exited with code {proc.returncode}")
+    return time.perf_counter() - start
+
+
+def run_pipeline(
+        targets=None,
+        force: bool = False,
+        dry_run: bool = False,
+        max_workers: int | None = None,
+        stages=STAGES,
+        cache_file=CACHE_FILE,
+) -> dict[str, str]:
+    """
+    Run the stage DAG, skipping stages whose fingerprint matches the last
+    successful run and running independent stages (e.g. checks next to the
+    downstream builds) concurrently.
+
+    A failed stage fails the pipeline; its downstream stages are not started,
+    independent branches run to completion.
+
+    :param targets: stages to bring up to date (with their upstream), default all
+    :param force: ignore the cache for the targets (every stage if no targets)
+    :param dry_run: only report which stages would run
+    :param max_workers: concurrent stages, default one per stage
+    :param stages: stage registry
+    :param cache_file: fingerprint cache
+    :return: {stage: "ran" | "cached" | "failed" | "blocked" | "would run"}
+    """
+
+    cache_file = Path(cache_file)
+    cache = _load_cache(cache_file)
+    deps = dependencies(stages)
+    pending = select_stages(targets, stages)
+    forced = set(targets or pending) if force else set()
+    status = {}
+
+    if dry_run:
+        for name in pending:
+            stale = name in forced or any(status[d] == "would run" for d in deps[name] if d in status)
+            if not stale:
+                fp = stage_fingerprint(name, cache["files"], stages)
+                stale = cache["stages"].get(name) != fp or not all(f.exists() for f in stages[name]["outputs"])
+            status[name] = "would run" if stale else "cached"
+            logger.info(f"{name:<20} {status[name]}")
+        return status
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(pending)) as pool:
+        while pending or running:
+            for name in list(pending):
+                upstream = [status.get(d) for d in deps[name]]
+                if any(s in ("failed", "blocked") for s in upstream):
+                    status[name] = "blocked"
+                    pending.remove(name)
+                    continue
+                if any(d not in status for d in deps[name]):
+                    continue
+
+                pending.remove(name)
+                fp = stage_fingerprint(name, cache["files"], stages)
+                outputs_ok = all(f.exists() for f in stages[name]["outputs"])
+                if name not in forced and outputs_ok and cache["stages"].get(name) == fp:
+                    status[name] = "cached"
+                    logger.info(f"stage `{name}` up to date, skipped")
+                    continue
+                logger.info(f"stage `{name}` started")
+                running[pool.submit(run_stage, name, stages)] = (name, fp)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, fp = running.pop(fut)
+                try:
+                    elapsed = fut.result()
+                except ValueError as err:
+                    status[name] = "failed"
+                    cache["stages"].pop(name, None)
+                    logger.error(str(err))
+                else:
+                    status[name] = "ran"
+                    cache["stages"][name] = fp
+                    logger.info(f"stage `{name}` finished in {elapsed:.2f}s")
+                _save_cache(cache, cache_file)
+
+    _save_cache(cache, cache_file)
+    return status
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run the churn pipeline DAG with stage-level caching.")
+    parser.add_argument("targets", nargs="*", help=f"stages to bring up to date, default all of {list(STAGES)}")
+    parser.add_argument("--force", action="store_true", help="re-run the targets regardless of the cache")
+    parser.add_argument("--dry-run", action="store_true", help="show which stages would run")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    status = run_pipeline(args.targets, force=args.force, dry_run=args.dry_run, max_workers=args.workers)
+    failed = [name for name, s in status.items() if s in ("failed", "blocked")]
+    if failed:
+        raise ValueError(f"Pipeline failed: {', '.join(f'{n} ({status[n]})' for n in failed)}")
+    logger.info(f"pipeline done: {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+# coding: utf-8
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from joblib import load
+from loguru import logger
+
+from constants import DATA
+from datasets.build_training_set import build_datasets
+from features.build_features import build_features
+from features.checks import FEATURE_RULES, REQUIRED_COLS
+from ingestion import arrow_csv
+from ingestion.load_raw import resolve_paths
+from ingestion.schemas import staging_schema
+from models.predict_baseline import score
+from pipelines.stages import (
+    CLEAN_FILE,
+    FEATURE_FILE,
+    INFERENCE_FILE,
+    MODEL_FILE,
+    PRED_FILE,
+    RAW_FILE,
+    STAGING_FILE,
+    TRAIN_FILE,
+    VALIDATION_FILE,
+)
+from staging.checks import STAGING_RULES
+from staging.transform import dictionary_encoded_frame, fused_transform
+from validation.engine import raise_on_violations, validate
+
+__all__ = [
+    "run_in_memory",
+]
+
+# Checkpoint file of each stage output, relative to the checkpoint directory.
+# With `checkpoint_dir=DATA` these are exactly the files the DAG runner uses.
+CHECKPOINTS = {
+    "staging": STAGING_FILE.relative_to(DATA),
+    "clean": CLEAN_FILE.relative_to(DATA),
+    "features": FEATURE_FILE.relative_to(DATA),
+    "train": TRAIN_FILE.relative_to(DATA),
+    "validation": VALIDATION_FILE.relative_to(DATA),
+    "inference": INFERENCE_FILE.relative_to(DATA),
+    "predictions": PRED_FILE.relative_to(DATA),
+}
+
+
+@contextmanager
+def _timed(stage: str, timings: dict):
+    start = time.perf_counter()
+    yield
+    timings[stage] = time.perf_counter() - start
+    logger.info(f"[in-memory] {stage}: {timings[stage]:.3f}s")
+
+
+def _write_checkpoint(data, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.is_symlink():
+        # published links (feature store, inference set) are replaced, not written through
+        path.unlink()
+    if isinstance(data, pa.Table):
+        pq.write_table(data, path)
+    else:
+        data.to_parquet(path, index=False)
+
+
+def run_in_memory(
+        raw_paths=RAW_FILE,
+        model_file=MODEL_FILE,
+        checkpoint_dir=None,
+        checks: bool = True,
+        training_sets: bool = False,
+) -> dict:
+    """
+    Run ingestion -> transform -> features -> scoring in one process,
+    handing Arrow tables / DataFrames from stage to stage instead of
+    writing and re-reading parquet files under `data/`.
+
+    Checkpoints are optional: with `checkpoint_dir` every stage output is
+    also written there as parquet, on a background thread so that the
+    writes overlap with the next stages' compute.
+
+    :param raw_paths: raw CSV file(s) or glob(s)
+    :param model_file: trained model bundle used for scoring
+    :param checkpoint_dir: directory for parquet checkpoints, none by default
+    :param checks: run staging / feature checks on the in-memory frames
+    :param training_sets: also build train / validation / inference sets
+    :return: {stage: output}, and "timings" {stage: seconds}
+    """
+
+    timings = {}
+    outputs = {"timings": timings}
+    writer = ThreadPoolExecutor(max_workers=1) if checkpoint_dir is not None else None
+    pending = []
+
+    def checkpoint(name: str, data) -> None:
+        outputs[name] = data
+        if writer is not None:
+            pending.append(writer.submit(_write_checkpoint, data, Path(checkpoint_dir) / CHECKPOINTS[name]))
+
+    try:
+        with _timed("load_raw", timings):
+            tables = [arrow_csv.read_staging_table(f, staging_schema) for f in resolve_paths(raw_paths)]
+            staging = pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+        checkpoint("staging", staging)
+
+        with _timed("transform", timings):
+            clean = fused_transform(dictionary_encoded_frame(staging))
+        checkpoint("clean", clean)
+
+        if checks:
+            with _timed("staging_checks", timings):
+                raise_on_violations(validate(clean, STAGING_RULES), "staging")
+
+        with _timed("build_features", timings):
+            features = build_features(clean)
+        checkpoint("features", features)
+
+        if checks:
+            with _timed("feature_checks", timings):
+                missing = [c for c in REQUIRED_COLS if c not in features.columns]
+                if missing:
+                    raise ValueError(f"Missing required feature columns: {missing}")
+                raise_on_violations(validate(features, FEATURE_RULES), "features")
+
+        if training_sets:
+            with _timed("build_training_set", timings):
+                train_df, validation_df, inference_df = build_datasets(features, clean)
+            checkpoint("train", train_df)
+            checkpoint("validation", validation_df)
+            checkpoint("inference", inference_df)
+
+        with _timed("predict", timings):
+            predictions = score(load(model_file), features)
+        checkpoint("predictions", predictions)
+    finally:
+        if writer is not None:
+            writer.shutdown(wait=True)
+    for fut in pending:
+        fut.result()
+
+    logger.info(f"[in-memory] {len(predictions)} customers scored in {sum(timings.values()):.3f}s")
+    return outputs
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Ad-hoc rescoring: raw extract to predictions in one process.")
+    parser.add_argument("paths", nargs="*", default=[str(RAW_FILE)], help="raw CSV files or glob patterns")
+    parser.add_argument("--model", default=str(MODEL_FILE))
+    parser.add_argument("--out", default=str(PRED_FILE), help="predictions parquet")
+    parser.add_argument("--checkpoint-dir", default=None,
+                        help="also write every stage output as parquet under this directory")
+    parser.add_argument("--skip-checks", action="store_true")
+    parser.add_argument("--training-sets", action="store_true", help="also build train/validation/inference sets")
+    args = parser.parse_args(argv)
+
+    outputs = run_in_memory(
+        args.paths,
+        model_file=args.model,
+        checkpoint_dir=args.checkpoint_dir,
+        checks=not args.skip_checks,
+        training_sets=args.training_sets,
+    )
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    outputs["predictions"].to_parquet(out, index=False)
+    logger.info(f"Saved predictions to: {out}")
+
+
+if __name__ == '__main__':
+    main()
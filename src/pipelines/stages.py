@@ -0,0 +1,87 @@
+# coding: utf-8
+from constants import DATA
+
+RAW_FILE = DATA / "raw" / "WA_Fn-UseC_-Telco-Customer-Churn.csv"
+STAGING_FILE = DATA / "staging" / "telco_customers_staging.parquet"
+CLEAN_FILE = DATA / "staging" / "telco_customers_clean.parquet"
+FEATURE_FILE = DATA / "features" / "telco_customer_features.parquet"
+TRAIN_FILE = DATA / "datasets" / "train.parquet"
+VALIDATION_FILE = DATA / "datasets" / "validation.parquet"
+INFERENCE_FILE = DATA / "datasets" / "inference.parquet"
+MODEL_FILE = DATA / "models" / "baseline_logreg.joblib"
+COMPILED_DIR = DATA / "models" / "baseline_logreg_compiled"
+VAL_PRED_FILE = DATA / "predictions" / "validation_predictions.parquet"
+PRED_FILE = DATA / "predictions" / "inference_predictions.parquet"
+
+# Source shared by every stage (relative to src/)
+COMMON_CODE = ["constants.py", "log_utils.py"]
+
+# Pipeline stages, in topological order.
+# Dependencies are derived from inputs/outputs: a stage runs after every
+# stage that produces one of its inputs. `code` lists the modules/packages
+# (relative to src/) whose source is part of the stage fingerprint.
+STAGES = {
+    "load_raw": {
+        "module": "ingestion.load_raw",
+        "args": [],
+        "inputs": [RAW_FILE],
+        "outputs": [STAGING_FILE],
+        "code": ["ingestion", "staging/domains.py"],
+    },
+    "transform": {
+        "module": "staging.transform",
+        "args": [],
+        "inputs": [STAGING_FILE],
+        "outputs": [CLEAN_FILE],
+        "code": ["staging/transform.py", "staging/domains.py"],
+    },
+    "staging_checks": {
+        "module": "staging.checks",
+        "args": [],
+        "inputs": [CLEAN_FILE],
+        "outputs": [],
+        "code": ["staging/checks.py", "staging/domains.py", "validation"],
+    },
+    "build_features": {
+        "module": "features.build_features",
+        "args": [],
+        "inputs": [CLEAN_FILE],
+        "outputs": [FEATURE_FILE],
+        "code": ["features"],
+    },
+    "feature_checks": {
+        "module": "features.checks",
+        "args": [],
+        "inputs": [FEATURE_FILE],
+        "outputs": [],
+        "code": ["features/checks.py", "features/feature_views.py", "validation"],
+    },
+    "build_training_set": {
+        "module": "datasets.build_training_set",
+        "args": [],
+        "inputs": [FEATURE_FILE, CLEAN_FILE],
+        "outputs": [TRAIN_FILE, VALIDATION_FILE, INFERENCE_FILE],
+        "code": ["datasets/build_training_set.py", "datasets/splits.py"],
+    },
+    "dataset_checks": {
+        "module": "datasets.checks",
+        "args": [],
+        "inputs": [TRAIN_FILE, VALIDATION_FILE, INFERENCE_FILE],
+        "outputs": [],
+        "code": ["datasets/checks.py", "validation"],
+    },
+    "train": {
+        "module": "models.train_baseline",
+        "args": [],
+        "inputs": [TRAIN_FILE, VALIDATION_FILE],
+        "outputs": [MODEL_FILE, COMPILED_DIR, VAL_PRED_FILE],
+        "code": ["models/train_baseline.py", "models/compiled_scorer.py", "models/preprocess_cache.py"],
+    },
+    "predict": {
+        "module": "models.predict_baseline",
+        "args": [],
+        "inputs": [INFERENCE_FILE, COMPILED_DIR],
+        "outputs": [PRED_FILE],
+        "code": ["models/predict_baseline.py", "models/compiled_scorer.py"],
+    },
+}
@@ -0,0 +1,289 @@
+# coding: utf-8
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from features.build_features import assemble_views, compute_view
+from features.feature_views import FEATURE_VIEWS
+from ingestion import arrow_csv
+from ingestion.schemas import staging_schema
+from models.predict_baseline import ENGINES, load_scorer, score
+from staging.transform import dictionary_encoded_frame, fused_transform
+
+__all__ = [
+    "LatencyMetrics",
+    "MicroBatcher",
+    "make_server",
+    "score_records",
+]
+
+HOST = "127.0.0.1"
+PORT = 8080
+
+# A batch is flushed when it reaches MAX_BATCH records, or MAX_WAIT_MS after
+# its first record arrived, whichever comes first.
+MAX_BATCH = 256
+MAX_WAIT_MS = 2.0
+
+# Latency samples kept for the percentiles in /metrics
+METRICS_WINDOW = 10_000
+
+RAW_COLUMNS = list(staging_schema)
+
+
+def score_records(records: list[dict], scorer: dict) -> pd.DataFrame:
+    """
+    Score raw CRM records (raw extract field names, e.g. `customerID`,
+    `TotalCharges`) through the same ingestion, transform and feature views
+    as the batch pipeline.
+
+    :param records: raw customer records
+    :param scorer: compiled artifact or sklearn bundle (see predict_baseline.load_scorer)
+    :return: DataFrame[customer_id, p_churn], in input order
+    """
+
+    missing = sorted({c for r in records for c in RAW_COLUMNS if c not in r})
+    if missing:
+        raise ValueError(f"Record(s) missing raw field(s): {missing}")
+
+    raw = pd.DataFrame.from_records(records, columns=RAW_COLUMNS)
+    table = arrow_csv.read_staging_table(raw.to_csv(index=False).encode(), staging_schema)
+    clean = fused_transform(dictionary_encoded_frame(table))
+    # Views run inline: for micro-batches a thread pool costs more than it saves
+    features = assemble_views(clean, [compute_view(name, clean) for name in FEATURE_VIEWS])
+    return score(scorer, features)
+
+
+class LatencyMetrics:
+    """
+    Thread-safe request latency / throughput counters.
+    """
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._batch_sizes = deque(maxlen=window)
+        self._started = time.perf_counter()
+        self._requests = 0
+        self._records = 0
+        self._errors = 0
+
+    def observe(self, seconds: float, n_records: int) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+            self._requests += 1
+            self._records += n_records
+
+    def observe_batch(self, size: int) -> None:
+        with self._lock:
+            self._batch_sizes.append(size)
+
+    def observe_error(self) -> None:
+        with self._lock:
+            self._errors += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lat = np.array(self._latencies) * 1e3
+            batches = np.array(self._batch_sizes)
+            elapsed = time.perf_counter() - self._started
+            requests, records, errors = self._requests, self._records, self._errors
+
+        return {
+            "requests": requests,
+            "records": records,
+            "errors": errors,
+            "uptime_s": round(elapsed, 3),
+            "requests_per_s": round(requests / elapsed, 2),
+            "records_per_s": round(records / elapsed, 2),
+            "latency_ms_p50": round(float(np.percentile(lat, 50)), 3) if len(lat) else None,
+            "latency_ms_p99": round(float(np.percentile(lat, 99)), 3) if len(lat) else None,
+            "mean_batch_size": round(float(batches.mean()), 2) if len(batches) else None,
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesce records from concurrent requests into one scoring call.
+
+    Request threads `submit` their records and wait on a Future; a single
+    worker thread drains the queue into batches of up to `max_batch` records
+    (waiting at most `max_wait_ms` for a batch to fill) and scores them
+    together.
+    """
+
+    def __init__(self, scorer: dict, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS,
+                 metrics: LatencyMetrics | None = None):
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1e3
+        self.metrics = metrics
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, records: list[dict]) -> Future:
+        fut = Future()
+        self._queue.put((records, fut))
+        return fut
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self, first) -> tuple[list, bool]:
+        batch, size = [first], len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            size += len(item[0])
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, closing = self._collect(first)
+            self._score(batch)
+            if closing:
+                return
+
+    def _score(self, batch: list) -> None:
+        records = [r for recs, _ in batch for r in recs]
+        try:
+            out = score_records(records, self.scorer)
+        except Exception:
+            # Fall back to one call per request so one bad record only fails its own request
+            for recs, fut in batch:
+                try:
+                    fut.set_result(score_records(recs, self.scorer))
+                except Exception as err:
+                    fut.set_exception(err)
+            return
+
+        if self.metrics is not None:
+            self.metrics.observe_batch(len(records))
+        start = 0
+        for recs, fut in batch:
+            fut.set_result(out.iloc[start:start + len(recs)])
+            start += len(recs)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    POST /score   {"customers": [raw record, ...]} or a single raw record
+    GET  /metrics latency percentiles and throughput
+    GET  /health
+    """
+
+    server_version = "churn-scoring/0.1"
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, payload) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            self._send(200, self.server.metrics.snapshot())
+        elif self.path == "/health":
+            self._send(200, {"status": "ok"})
+        else:
+            self._send(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path != "/score":
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+
+        start = time.perf_counter()
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            records = payload["customers"] if "customers" in payload else [payload]
+            out = self.server.batcher.submit(records).result()
+        except (ValueError, KeyError, TypeError) as err:
+            self.server.metrics.observe_error()
+            self._send(400, {"error": str(err)})
+            return
+        except Exception as err:
+            logger.exception(f"scoring failed: {err}")
+            self.server.metrics.observe_error()
+            self._send(500, {"error": "internal error"})
+            return
+
+        self.server.metrics.observe(time.perf_counter() - start, len(records))
+        self._send(200, {"predictions": [
+            {"customer_id": cid, "p_churn": float(p)} for cid, p in zip(out["customer_id"], out["p_churn"])
+        ]})
+
+    def log_message(self, format, *args) -> None:
+        # No per-request access log on the hot path; /metrics summarizes traffic
+        pass
+
+
+def make_server(
+        host: str = HOST,
+        port: int = PORT,
+        engine: str = "compiled",
+        max_batch: int = MAX_BATCH,
+        max_wait_ms: float = MAX_WAIT_MS,
+) -> ThreadingHTTPServer:
+    """
+    Build the scoring server: the scorer is loaded once and shared by the
+    micro-batcher; every connection is handled on its own thread.
+
+    :return: server, not started (call `serve_forever`)
+    """
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.metrics = LatencyMetrics()
+    server.batcher = MicroBatcher(load_scorer(engine), max_batch, max_wait_ms, server.metrics)
+    return server
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Online churn scoring service.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--engine", choices=ENGINES, default="compiled")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.engine, args.max_batch, args.max_wait_ms)
+    logger.info(f"Scoring service listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# coding: utf-8
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from loguru import logger
+
+__all__ = [
+    "DOMAIN_VALUES",
+    "NULL_POLICY",
+    "domain_categories",
+    "to_domain_categorical",
+    "encode_domain_columns",
+]
+
+# --- Domain definitions (canonical values expected after transform) ---
+DOMAIN_VALUES = {
+    "gender": {"Male", "Female"},
+    "phone_service": {"Yes", "No"},
+    "multiple_lines": {"Yes", "No", "NoPhone"},
+    "internet_service": {"DSL", "Fiber optic", "No"},
+    "online_security": {"Yes", "No", "NoInternet"},
+    "online_backup": {"Yes", "No", "NoInternet"},
+    "device_protection": {"Yes", "No", "NoInternet"},
+    "tech_support": {"Yes", "No", "NoInternet"},
+    "streaming_tv": {"Yes", "No", "NoInternet"},
+    "streaming_movies": {"Yes", "No", "NoInternet"},
+    "contract": {"Month-to-month", "One year", "Two year"},
+    "payment_method": {
+        "Electronic check",
+        "Mailed check",
+        "Bank transfer (automatic)",
+        "Credit card (automatic)",
+    },
+}
+
+# Some columns may legitimately contain missing values in staging/clean.
+# We keep this explicit to avoid accidental "string 'nan'" problems.
+NULL_POLICY = {
+    # total_charges can be NA only when tenure == 0 (validated in invariant checks)
+    "total_charges": "conditional",
+    # everything else below is expected non-null after cleaning
+    "gender": "no_null",
+    "phone_service": "no_null",
+    "multiple_lines": "no_null",
+    "internet_service": "no_null",
+    "contract": "no_null",
+    "payment_method": "no_null",
+}
+
+
+def domain_categories(col: str, extras=()) -> list[str]:
+    """
+    Fixed, ordered vocabulary of a domain column.
+
+    Canonical values come first (sorted, so codes are stable across files);
+    values outside the domain are appended instead of being dropped, so that
+    dirty data stays visible to the checks rather than turning into NULLs.
+
+    :param col: column name in DOMAIN_VALUES
+    :param extras: observed values, possibly outside the domain
+    :return:
+    """
+
+    canonical = sorted(DOMAIN_VALUES[col])
+    unknown = sorted(set(extras) - DOMAIN_VALUES[col])
+    return canonical + unknown
+
+
+def to_domain_categorical(s: pd.Series, col: str) -> pd.Series:
+    """
+    Store a domain column as a categorical with its fixed vocabulary.
+    Categorical input is recoded by category (no row-level string work).
+
+    :param s:
+    :param col:
+    :return:
+    """
+
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype("category")
+    observed = s.cat.categories.tolist()
+    categories = domain_categories(col, observed)
+    if len(categories) > len(DOMAIN_VALUES[col]):
+        logger.debug(f"`{col}`: values outside domain kept as extra categories: {categories[len(DOMAIN_VALUES[col]):]}")
+    return s.cat.set_categories(categories)
+
+
+def encode_domain_columns(table: pa.Table) -> pa.Table:
+    """
+    Dictionary-encode the domain columns of an arrow table with their fixed
+    vocabulary (see `domain_categories`). Other columns are left untouched.
+
+    :param table:
+    :return:
+    """
+
+    for col in DOMAIN_VALUES:
+        if col not in table.column_names:
+            continue
+        arr = table.column(col)
+        if pa.types.is_dictionary(arr.type):
+            arr = arr.cast(pa.string())
+        observed = [v for v in pc.unique(arr).to_pylist() if v is not None]
+        vocab = pa.array(domain_categories(col, observed), type=pa.string())
+        indices = pc.index_in(arr, value_set=vocab).cast(pa.int32())
+        chunks = [pa.DictionaryArray.from_arrays(c, vocab) for c in indices.chunks]
+        encoded = pa.chunked_array(chunks, type=pa.dictionary(pa.int32(), pa.string()))
+        table = table.set_column(table.column_names.index(col), col, encoded)
+    return table
@@ -1,13 +1,22 @@
 # coding: utf-8
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from constants import DATA
+from staging.domains import DOMAIN_VALUES, domain_categories, to_domain_categorical
 
 IN_FILE = DATA / "staging" / "telco_customers_staging.parquet"
 OUT_FILE = DATA / "staging" / "telco_customers_clean.parquet"
 
+ID_COL = "customer_id"
+
 NO_PHONE_MAP = {"No phone service": "NoPhone"}
 NO_INTERNET_MAP = {"No internet service": "NoInternet"}
+PHONE_SERVICE_MAP = {"yes": "Yes", "no": "No"}
 
 INTERNET_ADDON_COLS = [
     "online_security",
@@ -59,15 +68,189 @@ def normalize_phone_service(df: pd.DataFrame) -> pd.DataFrame:
     :return:
     """
 
-    df["phone_service"] = df["phone_service"].replace({"yes": "Yes", "no": "No"})
+    df["phone_service"] = df["phone_service"].replace(PHONE_SERVICE_MAP)
     return df
 
 
-def main():
-    df = pd.read_parquet(IN_FILE)
+# --- Fused transform engine ---
+# Value rewrites applied after stripping, per column. Together with the
+# strip on every string column this is exactly what `strip_string_columns`,
+# `canonicalize_vocabulary` and `normalize_phone_service` do in sequence.
+VALUE_MAPS = {
+    "multiple_lines": NO_PHONE_MAP,
+    **{col: NO_INTERNET_MAP for col in INTERNET_ADDON_COLS},
+    "phone_service": PHONE_SERVICE_MAP,
+}
+
+# Columns whose sampled distinct ratio exceeds this are rewritten row-wise
+# (e.g. customer_id); everything else is rewritten on its distinct values.
+DISTINCT_RATIO_LIMIT = 0.5
+DISTINCT_SAMPLE_ROWS = 10_000
+
+
+def compile_rules(columns) -> dict:
+    """
+    Compile the staging rules into one rewrite function per string column.
+
+    Each function maps an array of raw values to cleaned values and is meant
+    to be applied to the distinct values of a column, not to every row.
+
+    :param columns: string column names
+    :return: {column: callable(pd.Series) -> pd.Series}
+    """
+
+    def make_rule(value_map):
+        def rule(values: pd.Series) -> pd.Series:
+            values = values.astype("string").str.strip()
+            if value_map:
+                values = values.replace(value_map)
+            return values
+
+        return rule
+
+    return {col: make_rule(VALUE_MAPS.get(col)) for col in columns}
+
+
+def _rewrite_distinct(s: pd.Series, rule) -> pd.Series:
+    """
+    Apply `rule` once per distinct value of `s` and re-expand by integer codes.
+    Categorical input reuses its categories and codes directly.
+    """
+
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = s.cat.codes.to_numpy()
+        uniques = pd.Series(s.cat.categories)
+    else:
+        codes, uniques = pd.factorize(s)
+        uniques = pd.Series(uniques)
+
+    new_values = rule(uniques)
+    # Distinct raw values may collapse after rewriting (e.g. "Yes " -> "Yes")
+    remap, new_uniques = pd.factorize(new_values)
+    # Code -1 (missing) stays missing, also when the column is entirely null
+    new_codes = np.append(remap, -1)[codes]
+    cleaned = pd.Categorical.from_codes(new_codes, categories=new_uniques)
+    return pd.Series(cleaned, index=s.index, name=s.name)
+
+
+@lru_cache(maxsize=1024)
+def _domain_recode(col: str, categories: tuple) -> tuple[np.ndarray, pd.CategoricalDtype]:
+    """
+    Code lookup table from raw categories to the cleaned domain vocabulary.
+    Depends on the category list only, so it is computed once per distinct
+    vocabulary (staging files and online micro-batches share the same one).
+    """
+
+    cleaned = compile_rules([col])[col](pd.Series(categories, dtype="string"))
+    dtype = pd.CategoricalDtype(domain_categories(col, cleaned.dropna().unique()))
+    lut = dtype.categories.get_indexer(cleaned.astype(object).where(cleaned.notna(), None))
+    return lut, dtype
+
+
+def _recode_domain(s: pd.Series, col: str) -> pd.Series:
+    """
+    `to_domain_categorical(_rewrite_distinct(s, rule), col)` for categorical
+    input, through the cached per-vocabulary lookup table.
+    """
+
+    lut, dtype = _domain_recode(col, tuple(s.cat.categories))
+    lut = np.append(lut, -1)  # code -1 (missing) stays missing
+    codes = lut[s.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, dtype=dtype), index=s.index, name=s.name)
+
+
+def _is_low_cardinality(s: pd.Series) -> bool:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return True
+    sample = s.iloc[:DISTINCT_SAMPLE_ROWS]
+    return sample.nunique(dropna=False) <= DISTINCT_RATIO_LIMIT * max(len(sample), 1)
+
+
+def fused_transform(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Strip, canonicalize and normalize every string column in one pass per
+    column. Low-cardinality columns are rewritten on their distinct values
+    only (categorical codes or `pd.factorize`), then expanded by code.
+
+    Produces the same values as running `strip_string_columns`,
+    `canonicalize_vocabulary` and `normalize_phone_service` in order;
+    DOMAIN_VALUES columns are returned as fixed-vocabulary categoricals.
+
+    :param df:
+    :return:
+    """
+
+    string_cols = df.select_dtypes(include=["object", "string", "category"]).columns
+    rules = compile_rules(string_cols)
+
+    out = {}
+    for c in df.columns:
+        if c not in rules:
+            out[c] = df[c]
+        elif c in DOMAIN_VALUES and isinstance(df[c].dtype, pd.CategoricalDtype):
+            out[c] = _recode_domain(df[c], c)
+        elif c in DOMAIN_VALUES or _is_low_cardinality(df[c]):
+            cleaned = _rewrite_distinct(df[c], rules[c])
+            if c in DOMAIN_VALUES:
+                out[c] = to_domain_categorical(cleaned, c)
+            else:
+                out[c] = cleaned.astype("string")
+        else:
+            out[c] = rules[c](df[c])
+    return pd.DataFrame(out, index=df.index)
+
+
+def read_dictionary_encoded(path=IN_FILE) -> pd.DataFrame:
+    """
+    Read a staging parquet keeping every string column except the id as
+    categorical, straight from the parquet dictionary pages, so that
+    `fused_transform` never hashes row-level strings.
+
+    :param path: parquet file or dataset directory
+    :return:
+    """
+
+    dict_cols = _dictionary_columns(pq.ParquetDataset(path).schema)
+    return pq.read_table(path, read_dictionary=dict_cols).to_pandas()
+
+
+def _dictionary_columns(schema: pa.Schema) -> list[str]:
+    return [
+        f.name for f in schema
+        if f.name != ID_COL and (pa.types.is_string(f.type) or pa.types.is_large_string(f.type))
+    ]
+
+
+def dictionary_encoded_frame(table: pa.Table) -> pd.DataFrame:
+    """
+    In-memory counterpart of `read_dictionary_encoded`: dictionary-encode
+    the string columns of a staging table (e.g. straight from ingestion)
+    before converting it to pandas.
+
+    :param table: staging arrow table
+    :return:
+    """
+
+    for name in _dictionary_columns(table.schema):
+        idx = table.column_names.index(name)
+        table = table.set_column(idx, name, table.column(name).dictionary_encode())
+    return table.to_pandas()
+
+
+def legacy_transform(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reference implementation: one full-column pass per rule.
+    """
+
     df = strip_string_columns(df)
     df = canonicalize_vocabulary(df)
     df = normalize_phone_service(df)
+    return df
+
+
+def main():
+    df = read_dictionary_encoded(IN_FILE)
+    df = fused_transform(df)
     df.to_parquet(OUT_FILE, index=False)
 
 
@@ -0,0 +1,202 @@
+# coding: utf-8
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from log_utils import log_dataframe
+
+__all__ = [
+    "ColumnCache",
+    "evaluate_rule",
+    "raise_on_violations",
+    "validate",
+]
+
+# Rules are plain dicts, evaluated by `kind`:
+#   {"name", "kind": "not_null",       "column"}
+#   {"name", "kind": "unique",         "column"}
+#   {"name", "kind": "domain",         "column", "values"}
+#   {"name", "kind": "range",          "column", "min"?, "max"?}   (NULLs are not violations)
+#   {"name", "kind": "finite",         "column"}                   (NULL / NaN / inf are violations)
+#   {"name", "kind": "implies",        "if": cond, "then": cond}
+#   {"name", "kind": "null_only_when", "column", "when": cond}
+# where cond is {"column", "in": [...]} or {"column", "min"?, "max"?}.
+RULE_KINDS = ("not_null", "unique", "domain", "range", "finite", "implies", "null_only_when")
+
+REPORT_COLUMNS = ["rule", "kind", "columns", "n_violations", "sample_ids"]
+
+
+class ColumnCache:
+    """
+    Decode each column of a DataFrame at most once.
+
+    Low-cardinality columns are reduced to integer codes (categorical codes,
+    or `pd.factorize` for plain strings); membership tests then become a
+    lookup-table gather on the codes instead of a string comparison per row.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._codes = {}
+        self._null = {}
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def codes(self, col: str) -> tuple[np.ndarray, pd.Index]:
+        if col not in self._codes:
+            s = self.df[col]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                self._codes[col] = (s.cat.codes.to_numpy(), s.cat.categories)
+            else:
+                codes, uniques = pd.factorize(s)
+                self._codes[col] = (codes, pd.Index(uniques))
+        return self._codes[col]
+
+    def isnull(self, col: str) -> np.ndarray:
+        if col not in self._null:
+            s = self.df[col]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                self._null[col] = self.codes(col)[0] < 0
+            else:
+                self._null[col] = s.isna().to_numpy()
+        return self._null[col]
+
+    def isin(self, col: str, values) -> np.ndarray:
+        """
+        Row mask of `col in values`; NULL is never in `values`.
+        """
+
+        codes, categories = self.codes(col)
+        # Trailing False so that the NULL code (-1) gathers False
+        lut = np.append(categories.isin(list(values)), False)
+        return lut[codes]
+
+    def numeric(self, col: str) -> np.ndarray:
+        """
+        Column as float64 with NaN for NULL.
+        """
+
+        return self.df[col].to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _condition_mask(cache: ColumnCache, cond: dict) -> np.ndarray:
+    col = cond["column"]
+    if "in" in cond:
+        return cache.isin(col, cond["in"])
+
+    values = cache.numeric(col)
+    mask = ~np.isnan(values)
+    if cond.get("min") is not None:
+        mask &= values >= cond["min"]
+    if cond.get("max") is not None:
+        mask &= values <= cond["max"]
+    return mask
+
+
+def evaluate_rule(cache: ColumnCache, rule: dict) -> np.ndarray:
+    """
+    Evaluate one rule and return its violation mask.
+
+    :param cache: column cache over the data being validated
+    :param rule: rule dict (see RULE_KINDS)
+    :return: boolean array, True where the row violates the rule
+    """
+
+    kind = rule["kind"]
+    if kind == "not_null":
+        return cache.isnull(rule["column"])
+
+    if kind == "unique":
+        return cache.df[rule["column"]].duplicated(keep=False).to_numpy()
+
+    if kind == "domain":
+        return ~cache.isin(rule["column"], rule["values"]) & ~cache.isnull(rule["column"])
+
+    if kind == "range":
+        values = cache.numeric(rule["column"])
+        bad = np.zeros(len(values), dtype=bool)
+        if rule.get("min") is not None:
+            bad |= values < rule["min"]
+        if rule.get("max") is not None:
+            bad |= values > rule["max"]
+        return bad
+
+    if kind == "finite":
+        return ~np.isfinite(cache.numeric(rule["column"]))
+
+    if kind == "implies":
+        return _condition_mask(cache, rule["if"]) & ~_condition_mask(cache, rule["then"])
+
+    if kind == "null_only_when":
+        return cache.isnull(rule["column"]) & ~_condition_mask(cache, rule["when"])
+
+    raise ValueError(f"Unknown rule kind `{kind}` in rule `{rule.get('name')}`")
+
+
+def rule_columns(rule: dict) -> list[str]:
+    """
+    Columns a rule reads.
+    """
+
+    cols = [rule["column"]] if "column" in rule else []
+    for key in ("if", "then", "when"):
+        if key in rule:
+            cols.append(rule[key]["column"])
+    return list(dict.fromkeys(cols))
+
+
+def validate(
+        df: pd.DataFrame,
+        rules: list[dict],
+        id_col: str = "customer_id",
+        fail_fast: bool = False,
+        n_samples: int = 5,
+) -> pd.DataFrame:
+    """
+    Evaluate all rules over `df` and return a violation report.
+
+    Every column is decoded once (see `ColumnCache`) and shared by all rules
+    that read it. With `fail_fast`, evaluation stops at the first violated rule.
+
+    :param df: data to validate
+    :param rules: list of rule dicts
+    :param id_col: column used for sample ids in the report
+    :param fail_fast: stop at the first violated rule
+    :param n_samples: number of sample ids per violated rule
+    :return: DataFrame with one row per evaluated rule (REPORT_COLUMNS)
+    """
+
+    cache = ColumnCache(df)
+    ids = df[id_col].to_numpy() if id_col in df.columns else df.index.to_numpy()
+
+    rows = []
+    for rule in rules:
+        bad = evaluate_rule(cache, rule)
+        n_bad = int(bad.sum())
+        sample = ids[np.flatnonzero(bad)[:n_samples]].tolist() if n_bad else []
+        rows.append({
+            "rule": rule["name"],
+            "kind": rule["kind"],
+            "columns": rule_columns(rule),
+            "n_violations": n_bad,
+            "sample_ids": sample,
+        })
+        if n_bad and fail_fast:
+            break
+
+    return pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+
+def raise_on_violations(report: pd.DataFrame, name: str = "checks") -> None:
+    """
+    Log the report and raise if any rule was violated.
+    """
+
+    failed = report[report["n_violations"] > 0]
+    if failed.empty:
+        logger.info(f"[{name}] all {len(report)} rules passed")
+        return
+
+    log_dataframe(failed, f"[{name}] rule violations", max_rows=None, level=logger.error)
+    raise ValueError(f"[{name}] {len(failed)} rule(s) violated: {failed['rule'].tolist()}")
@@ -0,0 +1,293 @@
+# coding: utf-8
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from loguru import logger
+
+from validation.engine import REPORT_COLUMNS, rule_columns, validate
+
+__all__ = [
+    "UniqueTracker",
+    "hash_ids",
+    "iter_pieces",
+    "read_piece",
+    "row_group_stats",
+    "settled_by_stats",
+    "validate_parquet",
+]
+
+MAX_WORKERS = 8
+
+
+def iter_pieces(path) -> list[tuple[str, int]]:
+    """
+    List the row groups of a parquet file or dataset directory.
+
+    :param path: parquet file or dataset directory
+    :return: [(file, row_group_index), ...] in storage order
+    """
+
+    pieces = []
+    for f in sorted(pq.ParquetDataset(path).files):
+        n_groups = pq.ParquetFile(f).metadata.num_row_groups
+        pieces.extend((f, i) for i in range(n_groups))
+    return pieces
+
+
+def read_piece(piece: tuple[str, int], columns=None) -> pd.DataFrame:
+    f, i = piece
+    return pq.ParquetFile(f).read_row_group(i, columns=columns).to_pandas()
+
+
+def row_group_stats(piece: tuple[str, int]) -> dict:
+    """
+    Footer statistics of one row group, by column name.
+
+    :param piece: (file, row_group_index)
+    :return: {column: {"num_rows", "null_count", "min", "max"}}; min/max are
+             None when the writer stored no (or unusable) statistics
+    """
+
+    f, i = piece
+    rg = pq.ParquetFile(f).metadata.row_group(i)
+    out = {}
+    for j in range(rg.num_columns):
+        col = rg.column(j)
+        st = col.statistics
+        entry = {"num_rows": rg.num_rows, "null_count": None, "min": None, "max": None}
+        if st is not None:
+            if st.has_null_count:
+                entry["null_count"] = st.null_count
+            if st.has_min_max:
+                entry["min"], entry["max"] = st.min, st.max
+        out[col.path_in_schema] = entry
+    return out
+
+
+def _range_within(entry: dict, lo, hi) -> bool:
+    if entry["min"] is None or entry["max"] is None:
+        return False
+    if lo is not None and entry["min"] < lo:
+        return False
+    if hi is not None and entry["max"] > hi:
+        return False
+    return True
+
+
+def settled_by_stats(rule: dict, stats: dict) -> bool:
+    """
+    True when row-group statistics alone prove that no row violates `rule`.
+    False means "inconclusive" (the row group must be scanned), never "failed".
+
+    Float min/max ignore NaN in parquet, so `finite` is only settled for
+    integer columns.
+    """
+
+    kind = rule["kind"]
+    entry = stats.get(rule.get("column"))
+    if entry is None or entry["null_count"] is None:
+        return False
+    all_null = entry["null_count"] == entry["num_rows"]
+
+    if kind in ("not_null", "null_only_when"):
+        return entry["null_count"] == 0
+
+    if kind == "range":
+        return all_null or _range_within(entry, rule.get("min"), rule.get("max"))
+
+    if kind == "domain":
+        if all_null:
+            return True
+        lo, hi = entry["min"], entry["max"]
+        if lo is None or hi is None:
+            return False
+        if lo == hi:
+            return lo in rule["values"]
+        # Integer domains: every integer between min and max must be allowed
+        if isinstance(lo, (int, np.integer)) and not isinstance(lo, bool) and hi - lo <= len(rule["values"]):
+            return set(range(lo, hi + 1)) <= set(rule["values"])
+        return False
+
+    if kind == "finite":
+        return entry["null_count"] == 0 and isinstance(entry["min"], (int, np.integer))
+
+    return False
+
+
+def hash_ids(s: pd.Series) -> np.ndarray:
+    """
+    64-bit hash per value, stable across chunks, processes and runs.
+    """
+
+    return pd.util.hash_pandas_object(s, index=False).to_numpy()
+
+
+class UniqueTracker:
+    """
+    Streaming uniqueness state for one column.
+
+    Keeps only a 64-bit hash per row (8 bytes, instead of a Python string in
+    a `set`). Hash collisions are ruled out afterwards by `confirm`, which
+    compares the real values of the few rows whose hashes repeat.
+    """
+
+    def __init__(self):
+        self._hashes = []
+
+    def add(self, hashes: np.ndarray) -> None:
+        self._hashes.append(np.sort(hashes))
+
+    def all_hashes(self) -> np.ndarray:
+        if not self._hashes:
+            return np.empty(0, dtype="uint64")
+        merged = np.concatenate(self._hashes)
+        merged.sort(kind="mergesort")  # chunks are pre-sorted runs
+        return merged
+
+    def candidate_hashes(self) -> np.ndarray:
+        h = self.all_hashes()
+        return np.unique(h[1:][h[1:] == h[:-1]])
+
+    @staticmethod
+    def confirm(values: pd.Series) -> pd.Series:
+        """
+        Real duplicates among the candidate rows (keep=False semantics).
+        """
+
+        return values[values.duplicated(keep=False)]
+
+
+def _merge_reports(partials: list[pd.DataFrame], n_samples: int) -> pd.DataFrame:
+    merged = {}
+    for report in partials:
+        for row in report.itertuples(index=False):
+            acc = merged.setdefault(row.rule, {
+                "rule": row.rule,
+                "kind": row.kind,
+                "columns": row.columns,
+                "n_violations": 0,
+                "sample_ids": [],
+            })
+            acc["n_violations"] += row.n_violations
+            acc["sample_ids"] = (acc["sample_ids"] + list(row.sample_ids))[:n_samples]
+    return pd.DataFrame(list(merged.values()), columns=REPORT_COLUMNS)
+
+
+def validate_parquet(
+        path,
+        rules: list[dict],
+        id_col: str = "customer_id",
+        fail_fast: bool = False,
+        n_samples: int = 5,
+        max_workers: int = MAX_WORKERS,
+        name: str = "checks",
+        use_statistics: bool = True,
+) -> pd.DataFrame:
+    """
+    Validate a parquet file or dataset row group by row group.
+
+    Row-local rules run on each row group independently, in a thread pool,
+    reading only the columns the rules need. Rules that the row-group footer
+    statistics already prove (see `settled_by_stats`) are not scanned at all;
+    a row group whose rules are all settled is never read. `unique` rules
+    carry a `UniqueTracker` across row groups. Partial reports are merged in
+    storage order into the same report `validation.engine.validate` returns.
+
+    :param path: parquet file or dataset directory
+    :param rules: list of rule dicts
+    :param id_col: column used for sample ids
+    :param fail_fast: stop scheduling row groups after the first violation
+    :param n_samples: number of sample ids per violated rule
+    :param max_workers: thread pool size
+    :param name: label used in logs
+    :param use_statistics: settle rules from parquet statistics where possible
+    :return: violation report (one row per rule)
+    """
+
+    local_rules = [r for r in rules if r["kind"] != "unique"]
+    unique_rules = [r for r in rules if r["kind"] == "unique"]
+    unique_cols = [r["column"] for r in unique_rules]
+    pieces = iter_pieces(path)
+
+    def run(idx: int):
+        piece = pieces[idx]
+        stats = row_group_stats(piece) if use_statistics else {}
+        pending = [r for r in local_rules if not settled_by_stats(r, stats)]
+        settled = [r for r in local_rules if r not in pending]
+
+        columns = [c for r in pending for c in rule_columns(r)] + unique_cols
+        if pending:
+            columns.append(id_col)
+        columns = list(dict.fromkeys(columns))
+
+        if columns:
+            chunk = read_piece(piece, columns=columns)
+            n_rows = len(chunk)
+            report = validate(chunk, pending, id_col=id_col, fail_fast=fail_fast, n_samples=n_samples)
+            hashes = {c: hash_ids(chunk[c]) for c in unique_cols}
+        else:
+            n_rows = pq.ParquetFile(piece[0]).metadata.row_group(piece[1]).num_rows
+            report = pd.DataFrame(columns=REPORT_COLUMNS)
+            hashes = {}
+
+        passed = pd.DataFrame([
+            {"rule": r["name"], "kind": r["kind"], "columns": rule_columns(r), "n_violations": 0, "sample_ids": []}
+            for r in settled
+        ], columns=REPORT_COLUMNS)
+        return idx, n_rows, pd.concat([passed, report], ignore_index=True), hashes, len(settled)
+
+    trackers = {c: UniqueTracker() for c in unique_cols}
+    partials = {}
+    n_rows = 0
+    n_settled = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(run, i) for i in range(len(pieces))]
+        for fut in as_completed(futures):
+            idx, rows, report, hashes, settled = fut.result()
+            partials[idx] = report
+            n_rows += rows
+            n_settled += settled
+            for col, h in hashes.items():
+                trackers[col].add(h)
+            if fail_fast and (report["n_violations"] > 0).any():
+                for other in futures:
+                    other.cancel()
+                break
+
+    report = _merge_reports([partials[i] for i in sorted(partials)], n_samples)
+    unique_rows = [_unique_report(path, pieces, rule, trackers[rule["column"]], n_samples) for rule in unique_rules]
+    if unique_rows:
+        report = pd.concat([report, pd.DataFrame(unique_rows, columns=REPORT_COLUMNS)], ignore_index=True)
+    # Back to declaration order
+    order = {r["name"]: i for i, r in enumerate(rules)}
+    report = report.sort_values("rule", key=lambda s: s.map(order), kind="stable", ignore_index=True)
+
+    n_checks = len(local_rules) * len(partials)
+    logger.info(
+        f"[{name}] validated {n_rows} rows in {len(partials)}/{len(pieces)} row group(s); "
+        f"{n_settled}/{n_checks} rule checks settled from parquet statistics"
+    )
+    return report
+
+
+def _unique_report(path, pieces, rule: dict, tracker: UniqueTracker, n_samples: int) -> dict:
+    col = rule["column"]
+    candidates = tracker.candidate_hashes()
+    dups = pd.Series([], dtype=object)
+    if len(candidates):
+        # Second, narrow pass: only rows whose hash repeats, real values compared
+        parts = []
+        for piece in pieces:
+            ids = read_piece(piece, columns=[col])[col]
+            parts.append(ids[np.isin(hash_ids(ids), candidates)])
+        dups = UniqueTracker.confirm(pd.concat(parts, ignore_index=True))
+
+    return {
+        "rule": rule["name"],
+        "kind": rule["kind"],
+        "columns": [col],
+        "n_violations": len(dups),
+        "sample_ids": dups.head(n_samples).tolist(),
+    }